@@ -0,0 +1,125 @@
+import threading
+import weakref
+from collections import OrderedDict
+
+
+def _nbytes(buffer):
+    """The size of the image in the BytesIO buffer."""
+    return buffer.getbuffer().nbytes
+
+
+class ChartCacheBudget:
+    """
+    The limit of memory for the chart images of all the sessions together (shared by all the ChartCache objects).
+    When it is exceeded, the least recently used images are dropped from the cache, that takes the most memory.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._caches = weakref.WeakSet()  # The caches of the sessions, that are still alive
+        self._lock = threading.Lock()
+
+    def register(self, cache):
+        with self._lock:
+            self._caches.add(cache)
+
+    def nbytes(self):
+        with self._lock:
+            return sum(cache.nbytes for cache in list(self._caches))
+
+    def enforce(self):
+        """Evicts the images from the largest caches, until all of them fit into the budget."""
+        with self._lock:
+            caches = list(self._caches)
+            total = sum(cache.nbytes for cache in caches)
+            while total > self.max_bytes:
+                largest = max(caches, key=lambda cache: cache.nbytes)
+                freed = largest.evict_one()
+                if not freed:
+                    break
+                total -= freed
+
+
+class ChartCache:
+    """
+    The cache of the rendered chart images of one session: hash of the chart parameters -> (PNG buffer, width).
+
+    The images take a lot of memory (especially the high resolution ones), so the cache keeps them only within its
+    byte budget (and within the global budget of all the sessions, if it is given). The least recently used images
+    are dropped first, so the charts that people really come back to stay in the cache.
+    The counters of hits, misses and evictions show how well the budget fits the usage.
+    """
+
+    def __init__(self, max_bytes, budget: ChartCacheBudget = None):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # hash -> {"buffer": BytesIO, "width": int, "nbytes": int}, oldest first
+        self._lock = threading.RLock()  # The global budget can evict the images from another session's thread
+        self._budget = budget
+        if budget is not None:
+            budget.register(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Returns (buffer, width) of the cached image, or None if it is not in the cache."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            entry["buffer"].seek(0)
+            return entry["buffer"], entry["width"]
+
+    def put(self, key, buffer, width):
+        """Saves the image. An image, that is larger than the whole budget, is not cached at all."""
+        nbytes = _nbytes(buffer)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)["nbytes"]
+            self._entries[key] = {"buffer": buffer, "width": width, "nbytes": nbytes}
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self.evict_one()
+
+        if self._budget is not None:
+            self._budget.enforce()
+
+    def evict_one(self):
+        """Drops the least recently used image. Returns the amount of freed bytes (0 if the cache is empty)."""
+        with self._lock:
+            if not self._entries:
+                return 0
+            _, entry = self._entries.popitem(last=False)
+            self.nbytes -= entry["nbytes"]
+            self.evictions += 1
+            return entry["nbytes"]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """The counters of the cache, e.g. for showing them on the page."""
+        requests = self.hits + self.misses
+        return {
+            "images": len(self._entries),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
@@ -1,17 +1,24 @@
 import hashlib
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
 
-import streamlit as st
-from matplotlib import pyplot as plt
 import pandas as pd
-import seaborn as sns
+import streamlit as st
 import io
 import weakref
 
 from DashboardManager.DashboardItem import DashboardItem
 from DashboardManager.DashboardManagerEnums import ChartTypes, DashboardItemTypes
-from helpers import NUMERICAL_COLUMNS, CATEGORICAL_COLUMNS
+from DashboardManager.ChartRenderer import LARGE_CHART_ROWS, draw_chart, needs_rows
+from DashboardManager.VegaLiteCharts import build_chart
+from Dataset.DatasetStatistics import CI_BOOTSTRAP, CI_METHODS, CI_NONE, CI_NORMAL
+from Dataset.SessionDataset import SessionDataset
+from helpers import NUMERICAL_COLUMNS, CATEGORICAL_COLUMNS, get_data_content_key, get_shared_cache, download_dataset, \
+    get_dataset_file, get_dataset_statistics, submit_chart_render
 
 # Some constants
+PREVIEW_ROWS = 5_000  # The amount of rows, from which the preview of the chart is drawn
+CHART_POLL_INTERVAL = 0.5  # How often (in seconds) the page checks, whether the charts in the background are ready
 LIST_GRAPHS_1_VAR = [ChartTypes.BOXPLOT, ChartTypes.HISTOGRAM, ChartTypes.KDE]
 LIST_GRAPHS_2_VAR = [ChartTypes.SCATTER, ChartTypes.LINE, ChartTypes.BAR, ChartTypes.CATEGORICAL_BOXPLOTS]
 LIST_GRAPHS_3_OR_MORE_VAR = [ChartTypes.CORRELATION_HEATMAP,
@@ -33,8 +40,13 @@ class ChartItem(DashboardItem):
     x - X axis name. Must be the same as the name of corresponding column in the Dataframe
     y - Y axis name. Must be the same as the name of corresponding column in the Dataframe
     z - Z axis name. Must be the same as the name of corresponding column in the Dataframe
-    df: pandas.Dataframe - a link to the dataframe, the data from which is used for building a chart
+    df: pandas.Dataframe or SessionDataset - a link to the data, which is used for building a chart. The charts after
+        preprocessing are bound to the SessionDataset, so that they always show its current state
     high_res_mode: Bool - a flag representing whether the chart should be shown in high resolution
+    interactive_mode: Bool - a flag representing whether the chart is drawn by the browser (Vega-Lite) from the
+                      aggregated data, instead of the image rendered on the server
+    ci_method: str - the method of the confidence intervals of the means on the bar and line charts (one of
+               CI_METHODS): bootstrapped from the rows, analytic (from the cached group moments), or none
     """
 
     def __init__(self, id, on_change_function, df):
@@ -47,6 +59,9 @@ class ChartItem(DashboardItem):
         self.z = df.columns[0]
         self.df_ref = weakref.ref(df)
         self.high_res_mode = False
+        self.interactive_mode = False
+        self.ci_method = CI_BOOTSTRAP
+        self._data_version = self.get_data_version()  # The version of the data, the chart is up-to-date with
 
     def __repr__(self):
         """How this object is shown while debugging."""
@@ -57,23 +72,65 @@ class ChartItem(DashboardItem):
     #     return (f'ChartItem object of type **{self.chart_type}** with title '
     #             f'"**{self.title}**" and **{self.amount_of_params}** parameters.')
 
-    def _calculate_hash(self):
+    def _get_df(self):
+        """Returns the DataFrame, from which the chart is built."""
+        source = self.df_ref()
+        return source.frame if isinstance(source, SessionDataset) else source
+
+    def _get_column(self, name):
+        """Returns one column of the data of the chart, without materialising the whole SessionDataset."""
+        source = self.df_ref()
+        return source.column(name) if isinstance(source, SessionDataset) else source[name]
+
+    def get_dependencies(self):
+        """The columns of the dataset, that are shown on the chart."""
+        if self.amount_of_params == 1:
+            return [self.x]
+        elif self.amount_of_params == 2:
+            return [self.x] if self.x == self.y else [self.x, self.y]
+        else:
+            return list(NUMERICAL_COLUMNS)  # The correlation heatmap
+
+    def get_data_version(self, df=None):
+        """
+        Identifies the state of the data, which is shown on the chart: the source of the data, and the version of
+        the used columns (if the source is a SessionDataset; a plain DataFrame is never changed).
+        """
+        source = self.df_ref() if df is None else df
+        version = source.version(self.get_dependencies()) if isinstance(source, SessionDataset) else 0
+        return id(source), version
+
+    def is_outdated(self, df):
+        """Whether the chart should be updated to show the given data (because it or the used columns changed)."""
+        return self._data_version != self.get_data_version(df)
+
+    def update_data(self, on_change_function, df):
+        """Binds the chart to the (new version of the) data."""
+        self.on_change_function = on_change_function
+        self.df_ref = weakref.ref(df)
+        self.validate_chart()
+        self._data_version = self.get_data_version()
+
+    def _calculate_hash(self, data_key=None):
         """
         Calculates a hash for the current graph parameters to use for caching.
+
+        :param data_key: Identifies the data of the chart. By default, it is the version of the data in this session.
         """
-        # Hashing data from a DataFrame to track data changes
-        df = self.df_ref()
-        df_hash = hashlib.md5(pd.util.hash_pandas_object(df, index=True).values.tobytes()).hexdigest()
+        # The data is identified by its version (see get_data_version()) instead of hashing all of its values, so
+        # it costs O(1), and the edits of the columns, that are not shown on the chart, do not change the hash
+        data_version = self.get_data_version() if data_key is None else data_key
 
         # Collecting parameters for hashing
         params = (
-            df_hash,
+            data_version,
             self.chart_type,
             self.amount_of_params,
             self.x,
             self.y,
             self.z,
-            self.high_res_mode
+            self.high_res_mode,
+            self.ci_method
         )
 
         # Create hash from the parameters
@@ -106,7 +163,7 @@ class ChartItem(DashboardItem):
                 raise ValueError(f'Unknown axis_name: expected "x", "y", or "z"; but received {axis_name}.')
 
         # Check whether all the chart params are valid, and reset the wrong
-        df = self.df_ref()
+        df = self._get_df()
         self.validate_chart()
 
         # TODO: Automatically generate the names of the graphs(LLM?..)
@@ -121,11 +178,37 @@ class ChartItem(DashboardItem):
 
         # Then render the graph
 
-        chart_buffer, width = self.render_chart()  # Create graph as an image and get it width in pixels
+        # The interactive chart is drawn by the browser, the server only aggregates the data for it
+        if self.is_drawn_interactively():
+            data, vega_lite_spec = self.build_interactive_chart()
+            st.vega_lite_chart(data, vega_lite_spec, use_container_width=True)
 
-        # st.write(f"Width of the image: {width} pixels")
+        # The image is rendered in the worker process, while the rest of the page is shown. If it is not in the cache,
+        # the quick preview is shown instead, until the image is ready (see render_pending_charts())
+        else:
+            chart, hashes = self.submit_chart()
+            if isinstance(chart, Future):
+                st.session_state.setdefault("pending_charts", []).append((self, chart, hashes))
+                if self.high_res_mode:
+                    # The high resolution image takes long, so the normal one is shown meanwhile
+                    chart_buffer, width = self.render_preview()
+                    st.image(chart_buffer, width=width, use_container_width=False, output_format="PNG",
+                             caption="Preview: the chart in high resolution is being rendered...")
+                else:
+                    st.info("Rendering the chart...")
+            elif isinstance(chart, str):
+                st.error(f"The chart could not be rendered: {chart}")
+            else:
+                chart_buffer, width = chart
+                # st.write(f"Width of the image: {width} pixels")
+                st.image(chart_buffer, width=width, use_container_width=False, output_format="PNG")  # And show it
+            if self.interactive_mode:
+                st.caption("The interactive mode shows the means of numerical parameters only, so this chart is "
+                           "drawn on the server.")
 
-        st.image(chart_buffer, width=width, use_container_width=False, output_format="PNG")  # And show it
+        ci_description = self.describe_confidence_intervals()
+        if ci_description is not None:
+            st.caption(ci_description)
 
         # Editing the parameters of the graph in the expander bar
         with st.expander("Edit Chart Parameters"):
@@ -145,7 +228,17 @@ class ChartItem(DashboardItem):
                           value=self.high_res_mode,
                           key=f"high_res_mode_{pos_id}",
                           on_change=self.on_change_function,
-                          args=(pos_id, "high_res_mode", f"high_res_mode_{pos_id}")
+                          args=(pos_id, "high_res_mode", f"high_res_mode_{pos_id}"),
+                          disabled=self.interactive_mode  # The browser draws it in any resolution
+                          )
+            # If we want the browser to draw the chart
+            col2.checkbox("Enable interactive mode",
+                          value=self.interactive_mode,
+                          key=f"interactive_mode_{pos_id}",
+                          on_change=self.on_change_function,
+                          args=(pos_id, "interactive_mode", f"interactive_mode_{pos_id}"),
+                          help="The chart is drawn by your browser from the aggregated data (it can be zoomed and "
+                               "hovered), instead of the image rendered on the server."
                           )
 
             # Then choose the type of graph
@@ -189,6 +282,19 @@ class ChartItem(DashboardItem):
                 else:
                     render_axis_selectbox("y", df.columns, list(df.columns).index(self.y))
 
+                # The bar and line charts show the means of Y with their confidence intervals
+                if self.chart_type in (ChartTypes.BAR, ChartTypes.LINE):
+                    ci_methods = self.available_ci_methods()
+                    st.selectbox("Confidence Intervals", ci_methods,
+                                 index=ci_methods.index(self.ci_method),
+                                 key=f"ci_method_{pos_id}",
+                                 on_change=self.on_change_function,
+                                 args=(pos_id, "ci_method", f"ci_method_{pos_id}"),
+                                 help="The bootstrap resamples the rows 1000 times, so it is slow for large data. "
+                                      "The normal and Student's t intervals are calculated from the count, mean "
+                                      "and variance of every group, that are cached (for a numerical Y only)."
+                                 )
+
             else:
                 # If the option "more" is chosen
 
@@ -243,98 +349,213 @@ class ChartItem(DashboardItem):
     def get_graph_type(self):
         return self.chart_type
 
-    # @st.cache_data
-    def render_chart(_self):  # _self is for not to be visible for the st caching function
+    def get_spec(self):
         """
-        Render a chart based on the chart type and parameters.
-        (The result is cached to avoid redundant recalculations if the chart is not modified.) not yet
-
-        :return: The rendered chart object.
+        The parameters of the chart, that define its image (see ChartRenderer.draw_chart()).
+        The statistics of the whole dataset, that the chart needs, are taken from the cache of the dataset (see
+        helpers.get_dataset_statistics()) and passed with the parameters, so the renderer does not calculate them.
         """
+        spec = {
+            "chart_type": self.chart_type,
+            "amount_of_params": self.amount_of_params,
+            "x": self.x,
+            "y": self.y,
+            "high_res_mode": self.high_res_mode,
+        }
+        if self.chart_type == ChartTypes.HISTOGRAM:
+            # Always the same HISTOGRAM_BINS bins (kept by the running aggregates, while the rows are only appended)
+            if pd.api.types.is_numeric_dtype(self._get_column(self.x)):
+                spec["histogram"] = get_dataset_statistics(self.df_ref()).histogram(self.x)
+            else:
+                spec["value_counts"] = get_dataset_statistics(self.df_ref()).value_counts(self.x)
+        elif self.chart_type == ChartTypes.KDE:
+            spec["kde"] = get_dataset_statistics(self.df_ref()).kde(self.x)
+        elif self.chart_type == ChartTypes.CATEGORICAL_BOXPLOTS:
+            # The boxplots are drawn from the summaries of the groups only (see ChartRenderer._draw_boxplots()).
+            # Sort the categories on the graph - from the highest median to lowest
+            summaries = get_dataset_statistics(self.df_ref()).boxplot_summaries(self.x, self.y)
+            spec["summaries"] = summaries.sort_values("median", ascending=False, kind="stable")
+        elif self.chart_type in (ChartTypes.BAR, ChartTypes.LINE):
+            spec["ci_method"] = self.ci_method
+            if self.ci_method != CI_BOOTSTRAP and self.ci_method in self.available_ci_methods():
+                # The means and their intervals are drawn from the moments of the groups, without the rows
+                spec["moments"] = get_dataset_statistics(self.df_ref()).group_moments(self.x, self.y)
+        elif self.chart_type == ChartTypes.CORRELATION_HEATMAP:
+            spec["correlation"] = get_dataset_statistics(self.df_ref()).correlation_matrix(NUMERICAL_COLUMNS)
+        return spec
+
+    def available_ci_methods(self):
+        """
+        The methods of the confidence intervals, that can be chosen for the chart. The analytic intervals are
+        calculated from the moments of the numerical Y, so for the categorical Y there are only the bootstrap and none.
+        """
+        if pd.api.types.is_numeric_dtype(self._get_column(self.y)):
+            return CI_METHODS
+        return [CI_BOOTSTRAP, CI_NONE]
 
-        self = _self
+    def is_drawn_interactively(self):
+        """
+        Whether the chart is drawn by the browser (see VegaLiteCharts.build_chart()). The bar and line charts there
+        show the means of Y, so for the categorical Y the chart is rendered on the server instead.
+        """
+        if not self.interactive_mode:
+            return False
+        if self.chart_type in (ChartTypes.BAR, ChartTypes.LINE):
+            return pd.api.types.is_numeric_dtype(self._get_column(self.y))
+        return True
+
+    def describe_confidence_intervals(self):
+        """The description of the confidence intervals, that are shown on the chart (None if it has no means)."""
+        if self.chart_type not in (ChartTypes.BAR, ChartTypes.LINE):
+            return None
+        if self.ci_method == CI_NONE:
+            return "The means of each group, without confidence intervals."
+        if self.ci_method == CI_BOOTSTRAP:
+            if self.is_drawn_interactively():
+                return "The means of each group (the bootstrapped intervals are not shown in the interactive mode)."
+            if self.chart_type == ChartTypes.LINE and len(self.df_ref()) > LARGE_CHART_ROWS:
+                return "The means of each group (the bootstrapped intervals are skipped for such a large dataset)."
+            return "Confidence intervals: 95%, bootstrapped from the rows (1000 resamples)."
+        distribution = "the normal distribution" if self.ci_method == CI_NORMAL else "Student's t distribution"
+        return f"Confidence intervals: 95%, by {distribution} (from the count, mean and variance of each group)."
+
+    def _get_cached_chart(self):
+        """
+        Looks for the image of the chart in the caches.
 
+        :return: (buffer, width) of the image or None, and the hashes of the chart for the session and shared caches.
+        """
         # If the hash is already in the cache, return the saved image and width
         current_hash = self._calculate_hash()
-        if current_hash in st.session_state["chart_hashes"]:
-            return (st.session_state["chart_hashes"][current_hash]['buffer'],
-                    st.session_state["chart_hashes"][current_hash]['width'])
-
-        if self.high_res_mode:
-            fig, ax = plt.subplots(figsize=(30, 18))  # Resolution of 3000х1800 pixels
-            width = 3000
-        else:
-            fig, ax = plt.subplots(figsize=(10, 6))  # Resolution of 1000х600 pixels
-            width = 1000
+        cached_chart = st.session_state["chart_hashes"].get(current_hash)
+        if cached_chart is not None:
+            return cached_chart, (current_hash, None)
+
+        # The same chart of the same data could be rendered already by another session (or another server process),
+        # e.g. the charts of the beginner mode. The versions are known only in this session, so the data is
+        # identified by its content there
+        data_content_key = get_data_content_key(self.df_ref())
+        shared_hash = None if data_content_key is None else self._calculate_hash(data_content_key)
+        if shared_hash is not None:
+            shared_chart = get_shared_cache("charts").get(shared_hash)
+            if shared_chart is not None:
+                image, width = shared_chart
+                buf = io.BytesIO(image)
+                st.session_state['chart_hashes'].put(current_hash, buf, width)
+                return (buf, width), (current_hash, shared_hash)
+
+        return None, (current_hash, shared_hash)
+
+    @staticmethod
+    def _save_chart(hashes, image, width):
+        """Saves the rendered image in the caches, and returns it as (buffer, width)."""
+        current_hash, shared_hash = hashes
+        buf = io.BytesIO(image)
+
+        # Save the result in the Kache (see DashboardManager/ChartCache.py)
+        st.session_state['chart_hashes'].put(current_hash, buf, width)
+        if shared_hash is not None:
+            get_shared_cache("charts").put(shared_hash, (image, width))
 
-        df = self.df_ref()
+        return buf, width
 
-        if self.high_res_mode:
-            # Make the names of categories vertical, so that user can read it when there are a lot of them
-            if self.x in ("model", "brand"):
-                plt.xticks(rotation=90)
+    def render_chart(self):
+        """
+        Render a chart based on the chart type and parameters, in this process.
+        (The result is cached to avoid redundant recalculations if the chart is not modified.)
 
-            if self.amount_of_params == 2 and self.y in ("model", "brand"):
-                plt.yticks(rotation=90)
+        :return: The buffer with PNG image of the chart, and its width in pixels.
+        """
+        cached_chart, hashes = self._get_cached_chart()
+        if cached_chart is not None:
+            return cached_chart
 
-            plt.rcParams.update({'font.size': 8})
+        image, width = draw_chart(self.get_spec(), self._get_df())
+        return self._save_chart(hashes, image, width)
 
-        if self.amount_of_params == 1:
+    def render_preview(self):
+        """
+        Quick preview of the chart, while the high resolution image is being rendered: the same chart in the normal
+        resolution, if it is already in the cache (e.g. when the high resolution mode was just enabled), otherwise
+        the chart of at most PREVIEW_ROWS random rows, rendered here.
 
-            if self.chart_type == ChartTypes.BOXPLOT:
-                sns.boxplot(data=df, x=self.x)
-            elif self.chart_type == ChartTypes.HISTOGRAM:
-                sns.histplot(data=df, x=self.x, kde=False, ax=ax)
-            elif self.chart_type == ChartTypes.KDE:
-                sns.kdeplot(data=df, x=self.x, fill=True, ax=ax)
-            else:
-                raise ValueError(f"The chart_type of ChartItem object is unknown. Got: {self.chart_type}")
+        :return: The buffer with PNG image of the preview, and its width in pixels.
+        """
+        self.high_res_mode = False
+        try:
+            normal_chart = st.session_state["chart_hashes"].get(self._calculate_hash())
+        finally:
+            self.high_res_mode = True
+        if normal_chart is not None:
+            return normal_chart
+
+        preview_hash = self._calculate_hash() + "_preview"
+        preview = st.session_state["chart_hashes"].get(preview_hash)
+        if preview is None:
+            df = self._get_df()
+            if len(df) > PREVIEW_ROWS:
+                df = df[self.get_dependencies()].sample(PREVIEW_ROWS, random_state=42)
+            image, width = draw_chart({**self.get_spec(), "high_res_mode": False}, df)
+            preview = io.BytesIO(image), width
+            st.session_state["chart_hashes"].put(preview_hash, *preview)
+        return preview
+
+    def build_interactive_chart(self):
+        """
+        Aggregates the data for the interactive chart (see VegaLiteCharts.build_chart()).
+        The result for the last state of the chart is kept, so that the page reruns do not aggregate it again.
 
-        elif self.amount_of_params == 2:
-            if self.chart_type == ChartTypes.SCATTER:
-                sns.scatterplot(data=df, x=self.x, y=self.y)
-            elif self.chart_type == ChartTypes.LINE:
-                sns.lineplot(data=df, x=self.x, y=self.y)
-            elif self.chart_type == ChartTypes.BAR:
-                sns.barplot(data=df, x=self.x, y=self.y)
-            elif self.chart_type == ChartTypes.CATEGORICAL_BOXPLOTS:
-                # Assume that X is categorical and Y is not
-                cat_groups = df.groupby(self.x)[self.y].median().sort_values(ascending=False)
-                # Sort the categories on the graph - from the highest median to lowest
-                sns.boxplot(
-                    data=df,
-                    x=self.x,
-                    y=self.y,
-                    order=cat_groups.index,  # order
-                    showfliers=False
-                )
-            else:
-                raise ValueError(f"The chart_type of ChartItem object is unknown. Got: {self.chart_type}")
+        :return: The aggregated data and the Vega-Lite specification of the chart.
+        """
+        current_hash = self._calculate_hash()
+        cached_chart = getattr(self, "_interactive_chart", None)
+        if cached_chart is None or cached_chart[0] != current_hash:
+            self._interactive_chart = (current_hash, *build_chart(self.get_spec(), self._get_df()))
+        return self._interactive_chart[1:]
 
-        else:
-            if self.chart_type == ChartTypes.CORRELATION_HEATMAP:
-                corr_matrix = df[NUMERICAL_COLUMNS].corr()  # Only numerical params can be used here
-                sns.heatmap(corr_matrix, annot=True, fmt=".2f", cmap="coolwarm", ax=ax)
-                plt.title("Correlation Heatmap")
-            else:
-                raise ValueError(
-                    f"The chart_type of ChartItem object is unknown or unsupported for more than 2 parameters. Got: {self.chart_type}")
-            # pass  # TODO: other types of charts
-
-        # Save the image, close all the environment, and pass the image back
-        buf = io.BytesIO()
-        fig.savefig(buf, format='png')
-        buf.seek(0)
-        plt.close(fig)
-        plt.rcdefaults()
-
-        # Save the result in the Kache
-        st.session_state['chart_hashes'][current_hash] = {
-            'buffer': buf,
-            'width': width
-        }
+    def _get_chart_data(self, spec):
+        """
+        The data to be sent to the worker process for the spec: nothing, if the chart is drawn from the statistics
+        in the spec only; the path of the shared dataset file, if the chart shows it (the worker maps the same file);
+        otherwise only the columns of the chart.
+        """
+        if not needs_rows(spec):
+            return None
+        dataset_file = get_dataset_file()
+        if dataset_file is not None and self.df_ref() is download_dataset():
+            return dataset_file
+        return pd.DataFrame({name: self._get_column(name) for name in self.get_dependencies()})
+
+    def submit_chart(self):
+        """
+        Starts rendering the chart in the worker process (see helpers.submit_chart_render()).
 
-        return buf, width
+        :return: (buffer, width), if the chart is already in the cache, the error message (str), if the chart has
+                 failed to render, or the Future of (image, width) otherwise; and the hashes of the chart
+                 (for _save_chart()).
+        """
+        cached_chart, hashes = self._get_cached_chart()
+        if cached_chart is not None:
+            return cached_chart, hashes
+
+        # The chart in this state has failed to render - it is not rendered again, until the chart or its data changes
+        render_errors = st.session_state.setdefault("chart_render_errors", {})
+        if hashes[0] in render_errors:
+            return render_errors[hashes[0]], hashes
+
+        # The chart could be requested already in the previous run of the page, that was interrupted (e.g. by a
+        # button) before the image was received - then the same render is awaited
+        renders_in_progress = st.session_state.setdefault("chart_renders_in_progress", {})
+        if hashes[0] not in renders_in_progress:
+            spec = self.get_spec()
+            renders_in_progress[hashes[0]] = submit_chart_render(spec, self._get_chart_data(spec))
+
+        # The render could finish, while the page was not shown (e.g. the user has opened another page)
+        future = renders_in_progress[hashes[0]]
+        if future.done() and future.exception() is None:
+            del renders_in_progress[hashes[0]]
+            return self._save_chart(hashes, *future.result()), hashes
+        return future, hashes
 
     def validate_chart(self):
         """Sometimes there are the cases, when some graph arguments do not correspond for each other. This can
@@ -384,6 +605,12 @@ class ChartItem(DashboardItem):
                 elif self.x not in NUMERICAL_COLUMNS and self.y not in NUMERICAL_COLUMNS:
                     self.y = NUMERICAL_COLUMNS[0]
 
+            elif self.chart_type == ChartTypes.BAR or self.chart_type == ChartTypes.LINE:
+
+                # The analytic confidence intervals can be calculated for the numerical Y only
+                if self.ci_method not in self.available_ci_methods():
+                    self.ci_method = CI_BOOTSTRAP
+
         elif self.amount_of_params == "more":
             # check if the current graph type can be chosen when we have 3 or more graph params (axis)
             if not any(list(map(lambda x: x == self.chart_type, LIST_GRAPHS_3_OR_MORE_VAR))):
@@ -393,3 +620,43 @@ class ChartItem(DashboardItem):
         else:
             raise ValueError(f"Unexpected amount of params during Chart validation: "
                              f"expected 1, 2, or 'more'; got {self.amount_of_params}")
+
+
+def render_pending_charts():
+    """
+    Replaces the previews of the charts, that are rendered in the worker processes, by the full images, as soon as
+    they are ready. It must be called at the end of the page, after all the items are rendered.
+    The page itself does not wait for the images: they are awaited in the background (by the fragment, that checks
+    them periodically), and the page is rerun, when any of them is ready.
+    """
+    pending_charts = st.session_state.pop("pending_charts", [])
+    if pending_charts:
+        st.session_state.awaited_charts = pending_charts
+        _await_pending_charts()
+
+
+@st.fragment(run_every=CHART_POLL_INTERVAL)
+def _await_pending_charts():
+    renders_in_progress = st.session_state.get("chart_renders_in_progress", {})
+    awaited_charts = st.session_state.get("awaited_charts", [])
+    ready_charts = [(item, future, hashes) for item, future, hashes in awaited_charts if future.done()]
+    if not ready_charts:
+        return
+
+    for item, future, hashes in ready_charts:
+        renders_in_progress.pop(hashes[0], None)
+        try:
+            try:
+                image, width = future.result()
+            except BrokenProcessPool:
+                # The worker process has died (e.g. out of memory) - render the chart here instead. The broken pool
+                # is replaced at the next submit (see helpers.submit_chart_render())
+                image, width = draw_chart(item.get_spec(), item._get_df())
+        except Exception as e:
+            # Shown instead of the chart (see submit_chart()), the other charts are still awaited
+            st.session_state.setdefault("chart_render_errors", {})[hashes[0]] = f"{type(e).__name__}: {e}"
+            continue
+        item._save_chart(hashes, image, width)
+
+    st.session_state.awaited_charts = [chart for chart in awaited_charts if not chart[1].done()]
+    st.rerun(scope="app")  # The page shows the ready charts from the cache
@@ -0,0 +1,292 @@
+import io
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from matplotlib import pyplot as plt
+import seaborn as sns
+
+from DashboardManager.DashboardManagerEnums import ChartTypes
+from Dataset.DatasetSchema import NUMERICAL_COLUMNS
+from Dataset.DatasetStatistics import CI_NONE, mean_confidence_intervals
+from Dataset.KernelDensity import kde
+from Dataset.QueryBackend import correlation_matrix, five_number_summaries, group_aggregate
+from Dataset.RunningAggregates import HISTOGRAM_BINS
+from Dataset.SharedDataset import read_shared_dataset
+
+# Above this amount of rows, the scatter and line charts are drawn from the aggregated data instead of every row,
+# so that their render time does not depend on the size of the dataset
+LARGE_CHART_ROWS = 100_000
+HEXBIN_GRID_SIZE = 60  # The amount of hexagons along the X-axis of the density chart
+LINE_MAX_POINTS = 2_000  # The amount of points, to which the long lines are decimated
+
+# The datasets, opened in this (worker) process: path -> DataFrame (memory-mapped, so opening it costs nothing)
+_shared_datasets = {}
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets decimation of the line: keeps n_out of its points (the first, the last, and in
+    every bucket between them the one, that forms the largest triangle with its neighbours), so that the shape of
+    the line stays the same.
+
+    :param x: Sorted X values.
+    :param y: Y values.
+    :return: The indices of the kept points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # Bucket i is [edges[i], edges[i + 1])
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # The average point of the next bucket (the last point for the last bucket)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        prev_x, prev_y = x[kept[i]], y[kept[i]]
+        areas = np.abs((prev_x - next_x) * (y[start:end] - prev_y) - (prev_x - x[start:end]) * (next_y - prev_y))
+        kept[i + 1] = start + int(np.argmax(areas))
+    return kept
+
+
+def _draw_large_scatter(df, x, y, ax):
+    """
+    Density of the points instead of the points themselves: hexagonal bins with the amount of rows in them.
+    Categorical axes can not be binned, so then the uniform random sample of the rows is drawn instead.
+    """
+    if pd.api.types.is_numeric_dtype(df[x]) and pd.api.types.is_numeric_dtype(df[y]):
+        x_values, y_values = df[x].to_numpy(dtype=np.float64), df[y].to_numpy(dtype=np.float64)
+        known = ~(np.isnan(x_values) | np.isnan(y_values))
+        hexbin = ax.hexbin(x_values[known], y_values[known], gridsize=HEXBIN_GRID_SIZE, mincnt=1, bins="log",
+                           cmap="viridis")
+        plt.colorbar(hexbin, ax=ax, label="Number of rows")
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+    else:
+        sns.scatterplot(data=df.sample(LARGE_CHART_ROWS, random_state=42), x=x, y=y, ax=ax)
+
+
+def _draw_large_line(df, x, y, ax):
+    """The mean of Y for every X (as sns.lineplot shows it, but without the bootstrapped confidence interval)."""
+    means = group_aggregate(df, x, y, "mean").dropna()
+    if pd.api.types.is_numeric_dtype(df[x]):
+        means = means.sort_index()
+        kept = lttb(means.index.to_numpy(dtype=np.float64), means.to_numpy(dtype=np.float64), LINE_MAX_POINTS)
+        means = means.iloc[kept]
+    sns.lineplot(x=means.index, y=means.values, ax=ax)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+
+
+def _seaborn_errorbar(spec):
+    """The errorbar of seaborn for the bar and line charts, that are drawn from the rows (bootstrapped or none)."""
+    return None if spec.get("ci_method") == CI_NONE else ("ci", 95)
+
+
+def _draw_means(spec, ax):
+    """
+    The bar or line chart of the means of Y for every X, drawn from the moments of the groups only (see
+    ChartItem.get_spec()), with the analytic confidence intervals instead of the bootstrapped ones.
+    """
+    x, y, moments = spec["x"], spec["y"], spec["moments"].dropna(subset=["mean"])
+    color = sns.color_palette()[0]
+
+    if spec["chart_type"] == ChartTypes.LINE and pd.api.types.is_numeric_dtype(moments.index):
+        moments = moments.sort_index()
+        kept = lttb(moments.index.to_numpy(dtype=np.float64), moments["mean"].to_numpy(dtype=np.float64),
+                    LINE_MAX_POINTS)
+        moments = moments.iloc[kept]
+        positions = moments.index.to_numpy(dtype=np.float64)
+    else:
+        # The categories are placed in a row, as seaborn does it
+        positions = np.arange(len(moments))
+        ax.set_xticks(positions, [str(name) for name in moments.index])
+
+    means = moments["mean"].to_numpy(dtype=np.float64)
+    errors = None if spec["ci_method"] == CI_NONE else mean_confidence_intervals(moments, spec["ci_method"]).to_numpy()
+    if spec["chart_type"] == ChartTypes.BAR:
+        ax.bar(positions, means, width=0.8, color=color, yerr=errors, ecolor="0.26")
+    else:
+        ax.plot(positions, means, color=color)
+        if errors is not None:
+            ax.fill_between(positions, means - errors, means + errors, color=color, alpha=0.2, linewidth=0)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+
+
+def _draw_histogram(counts, edges, x, ax):
+    """The histogram (as sns.histplot() draws it) from the counts of its bins."""
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color=sns.color_palette()[0], alpha=0.75,
+           edgecolor="black", linewidth=0.5)
+    ax.set_xlabel(x)
+    ax.set_ylabel("Count")
+
+
+def _draw_kde(grid, density, x, ax):
+    """The filled curve of the kernel density (as sns.kdeplot(fill=True) draws it), from the density on the grid."""
+    color = sns.color_palette()[0]
+    ax.fill_between(grid, density, color=color, alpha=0.25, linewidth=0)
+    ax.plot(grid, density, color=color, linewidth=1)
+    ax.set_ylim(bottom=0)
+    ax.set_xlabel(x)
+    ax.set_ylabel("Density")
+
+
+def _draw_boxplots(summaries, x, y, ax):
+    """
+    Draws the boxplots from their summaries only (see QueryBackend.five_number_summaries()), so the time of drawing
+    depends on the amount of the categories, and not on the amount of rows. The outliers are not drawn.
+    """
+    boxes = [
+        {"label": str(name), "whislo": row.lower, "q1": row.q1, "med": row.median, "q3": row.q3, "whishi": row.upper}
+        for name, row in zip(summaries.index, summaries.itertuples(index=False))
+    ]
+    lines = {"color": "0.25"}  # The same colors as sns.boxplot() uses
+    ax.bxp(boxes, showfliers=False, patch_artist=True, widths=0.8,
+           boxprops={"facecolor": sns.color_palette()[0], "edgecolor": "0.25"},
+           whiskerprops=lines, capprops=lines, medianprops=lines)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+
+
+def needs_rows(spec: dict) -> bool:
+    """Whether draw_chart() reads the rows of the data, or draws the chart from the statistics in the spec only."""
+    chart_type = spec["chart_type"]
+    if chart_type == ChartTypes.HISTOGRAM:
+        statistic = "histogram"
+    elif chart_type == ChartTypes.KDE:
+        statistic = "kde"
+    elif chart_type == ChartTypes.CATEGORICAL_BOXPLOTS:
+        statistic = "summaries"
+    elif chart_type in (ChartTypes.BAR, ChartTypes.LINE):
+        statistic = "moments"
+    elif chart_type == ChartTypes.CORRELATION_HEATMAP:
+        statistic = "correlation"
+    else:
+        return True
+    return spec.get(statistic) is None
+
+
+def draw_chart(spec: dict, df):
+    """
+    Draws the chart into the PNG image. It depends only on its arguments, so it can be called in any process.
+
+    :param spec: The parameters of the chart: chart_type, amount_of_params, x, y, high_res_mode, and optionally
+                 the precalculated statistics: histogram (the counts and edges of the bins), value_counts (of
+                 the categorical histogram), kde (the grid and the density on it), summaries (of the
+                 categorical boxplots, in the order of drawing),
+                 ci_method and moments (of the groups of the bar and line charts, drawn with the analytic
+                 confidence intervals) and correlation (the matrix of the heatmap) - see ChartItem.get_spec().
+    :param df: The DataFrame with (at least) the columns, that are shown on the chart
+               (None, if the chart is drawn from the statistics only - see needs_rows()).
+    :return: The PNG image (bytes) and its width in pixels.
+    """
+    chart_type, amount_of_params, x, y = spec["chart_type"], spec["amount_of_params"], spec["x"], spec["y"]
+
+    if spec["high_res_mode"]:
+        fig, ax = plt.subplots(figsize=(30, 18))  # Resolution of 3000х1800 pixels
+        width = 3000
+    else:
+        fig, ax = plt.subplots(figsize=(10, 6))  # Resolution of 1000х600 pixels
+        width = 1000
+
+    if spec["high_res_mode"]:
+        # Make the names of categories vertical, so that user can read it when there are a lot of them
+        if x in ("model", "brand"):
+            plt.xticks(rotation=90)
+
+        if amount_of_params == 2 and y in ("model", "brand"):
+            plt.yticks(rotation=90)
+
+        plt.rcParams.update({'font.size': 8})
+
+    if amount_of_params == 1:
+
+        if chart_type == ChartTypes.BOXPLOT:
+            sns.boxplot(data=df, x=x)
+        elif chart_type == ChartTypes.HISTOGRAM:
+            if spec.get("histogram") is not None:
+                _draw_histogram(*spec["histogram"], x, ax)  # The numerical column, from the cached counts
+            else:
+                sns.histplot(data=df, x=x, bins=HISTOGRAM_BINS, kde=False, ax=ax)
+        elif chart_type == ChartTypes.KDE:
+            # Binned and convolved by FFT (see Dataset/KernelDensity.py), so it does not depend on the amount of rows
+            grid, density = spec["kde"] if spec.get("kde") is not None else kde(df[x])
+            _draw_kde(grid, density, x, ax)
+        else:
+            raise ValueError(f"The chart_type of ChartItem object is unknown. Got: {chart_type}")
+
+    elif amount_of_params == 2:
+        if chart_type == ChartTypes.SCATTER:
+            if len(df) > LARGE_CHART_ROWS:
+                _draw_large_scatter(df, x, y, ax)
+            else:
+                sns.scatterplot(data=df, x=x, y=y)
+        elif chart_type == ChartTypes.LINE:
+            if spec.get("moments") is not None:
+                _draw_means(spec, ax)
+            elif len(df) > LARGE_CHART_ROWS:
+                _draw_large_line(df, x, y, ax)
+            else:
+                sns.lineplot(data=df, x=x, y=y, errorbar=_seaborn_errorbar(spec))
+        elif chart_type == ChartTypes.BAR:
+            if spec.get("moments") is not None:
+                _draw_means(spec, ax)
+            else:
+                sns.barplot(data=df, x=x, y=y, errorbar=_seaborn_errorbar(spec))
+        elif chart_type == ChartTypes.CATEGORICAL_BOXPLOTS:
+            # Assume that X is categorical and Y is not
+            summaries = spec.get("summaries")
+            if summaries is None:
+                # Sort the categories on the graph - from the highest median to lowest
+                summaries = five_number_summaries(df, x, y).sort_values("median", ascending=False, kind="stable")
+            _draw_boxplots(summaries, x, y, ax)
+        else:
+            raise ValueError(f"The chart_type of ChartItem object is unknown. Got: {chart_type}")
+
+    else:
+        if chart_type == ChartTypes.CORRELATION_HEATMAP:
+            corr_matrix = spec.get("correlation")
+            if corr_matrix is None:
+                corr_matrix = correlation_matrix(df, NUMERICAL_COLUMNS)  # Only numerical params can be used here
+            sns.heatmap(corr_matrix, annot=True, fmt=".2f", cmap="coolwarm", ax=ax)
+            plt.title("Correlation Heatmap")
+        else:
+            raise ValueError(
+                f"The chart_type of ChartItem object is unknown or unsupported for more than 2 parameters. Got: {chart_type}")
+        # pass  # TODO: other types of charts
+
+    if spec["high_res_mode"] and x in ("model", "brand") and chart_type in (ChartTypes.CATEGORICAL_BOXPLOTS,
+                                                                             ChartTypes.BAR, ChartTypes.LINE):
+        ax.tick_params(axis="x", labelrotation=90)  # The labels, that were set while drawing the chart
+
+    # Save the image, close all the environment, and pass the image back
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    plt.close(fig)
+    plt.rcdefaults()
+
+    return buf.getvalue(), width
+
+
+def init_worker():
+    """Initializer of the worker processes: they only draw into the images, without any GUI."""
+    matplotlib.use("Agg")
+
+
+def draw_chart_in_worker(spec: dict, data):
+    """
+    Draws the chart in the worker process (see draw_chart()).
+
+    :param data: Either the path of the shared dataset file (it is memory-mapped, so the data is not sent to the
+                 worker at all), the DataFrame with only the columns of the chart, or None, if the chart is drawn
+                 from the statistics in the spec only.
+    """
+    if isinstance(data, str):
+        if data not in _shared_datasets:
+            _shared_datasets[data] = read_shared_dataset(data)
+        data = _shared_datasets[data]
+    return draw_chart(spec, data)
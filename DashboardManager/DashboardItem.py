@@ -17,6 +17,10 @@ class DashboardItem(ABC):
         """Renders this item from the very beginning to the very end."""
         pass
 
+    def get_dependencies(self) -> list:
+        """The columns of the dataset, which are shown by this item. Items without data depend on nothing."""
+        return []
+
     def __setitem__(self, key, value):
         setattr(self, key, value)  # Dynamic setter for DashboardItem
 
@@ -28,7 +32,9 @@ class DashboardItem(ABC):
         return json.dumps(
             {
                 "type": self.get_type().name,
-                **{k: v for k, v in self.__dict__.items() if k not in ["on_change_function", "df"]},
+                # Private attributes (e.g. the cached state) describe the session, not the item, so are not saved
+                **{k: v for k, v in self.__dict__.items()
+                   if k not in ["on_change_function", "df"] and not k.startswith("_")},
             },
             default=str,  # Handle non-serializable types
         )
@@ -166,16 +166,18 @@ class DashboardManager:
             elif item_type == DashboardItemTypes.PREPROCESSING_BOX:
                 preproc_type = item_data["preprocessing_type"]
                 action = item_data["action"]
-                new_item = PreprocessingItem(action=action, preproc_type=preproc_type)
-                execute_preprocessing_action(
+                # The item is created by the action itself (so that it is the same one, that is kept in the
+                # preprocessing checkpoints)
+                new_item = execute_preprocessing_action(
                     action_type=preproc_type,
                     manager=self,
-                    df=df,
+                    dataset=df,
                     column=action["column"] if "column" in action else None,
                     method=action["method"] if "method" in action else None,
                     scaling_method=action["scaling_method"] if "scaling_method" in action else None,
                     mapping=action["mapping"] if "mapping" in action else None,
-                    threshold=action["threshold"] if "threshold" in action else None
+                    threshold=action["threshold"] if "threshold" in action else None,
+                    columns=action["columns"] if "columns" in action else None
                 )
             else:
                 raise ValueError(f"Unsupported item type: {item_type}")
@@ -193,44 +195,17 @@ class DashboardManager:
         return json.dumps(items_data, indent=4, ensure_ascii=False)
 
     def reload_items(self, on_change_function, df):
-        """Recreates all the items to update their info"""
-
-        items_data = {
-            item_id: json.loads(str(item)) for item_id, item in self.items.items()
-        }
-
-        for i in items_data.values():
-            if "df_ref" in i:
-                del i["df_ref"]
-
-        self.items.clear()
-        for item_id, item_data in items_data.items():
-            item_type = DashboardItemTypes[item_data["type"]]  # Extract the item type
-            del item_data["type"]  # Remove type from the data as it's used for initialization
-            if item_type == DashboardItemTypes.CHART:
-                new_item = ChartItem(id=int(item_id), on_change_function=on_change_function, df=df)
-                for key, value in item_data.items():
-                    new_item[key] = value
-            elif item_type == DashboardItemTypes.MD_BOX:
-                new_item = MDBoxItem(manager_page_number=self.page_number, on_change_function=on_change_function)
-                for key, value in item_data.items():
-                    new_item[key] = value
-            elif item_type == DashboardItemTypes.PREPROCESSING_BOX:
-                preproc_type = item_data["preprocessing_type"]
-                action = item_data["action"]
-                new_item = PreprocessingItem(action=action, preproc_type=preproc_type)
-                execute_preprocessing_action(
-                    action_type=preproc_type,
-                    manager=self,
-                    df=df,
-                    column=action["column"] if "column" in action else None,
-                    method=action["method"] if "method" in action else None,
-                    scaling_method=action["scaling_method"] if "scaling_method" in action else None,
-                    mapping=action["mapping"] if "mapping" in action else None,
-                    threshold=action["threshold"] if "threshold" in action else None
-                )
-            else:
-                raise ValueError(f"Unsupported item type: {item_type}")
-            self.items[int(item_id)] = new_item
+        """
+        Updates the items, whose data has changed since the last update (e.g. after appending the fake data, or
+        after a preprocessing action on the columns they show). Every item declares the columns it depends on
+        (see DashboardItem.get_dependencies()), so the other items, as well as the preprocessing actions, are left
+        as they are.
 
-        # st.rerun()
+        :return: The ids of the updated items.
+        """
+        updated_ids = []
+        for item_id, item in self.items.items():
+            if item.get_type() == DashboardItemTypes.CHART and item.is_outdated(df):
+                item.update_data(on_change_function, df)
+                updated_ids.append(item_id)
+        return updated_ids
@@ -10,7 +10,6 @@ from xgboost import XGBRegressor
 from catboost import CatBoostRegressor
 
 from DashboardManager.Model.ModelRelatedEnums import LossFunctions, MLModelTypes
-from helpers import reverse_preprocessing
 
 
 class MLModel:
@@ -66,7 +65,9 @@ class MLModel:
         return st.session_state["ml_model"]
 
     def __init__(self, df: DataFrame):
-        pass
+        # The model is a singleton, but the session dataset is rebuilt after every preprocessing action,
+        # so the model should always refer to the latest version of it
+        self.df = df
 
     def __setitem__(self, key, value):
         setattr(self, key, value)  # Dynamic setter
@@ -176,8 +177,9 @@ class MLModel:
 
         # Combine test features, true values, and predictions into a single DataFrame
         results_df = test_X.copy()  # Copy all columns from the test set
-        results_df["True_Value"] = [reverse_preprocessing("price_EUR", i) for i in test_y.values]  # Adding true values
-        results_df["Prediction"] = [int(reverse_preprocessing("price_EUR", i)) for i in test_preds]  # Adding predictions
+        pipeline = st.session_state.preprocessing_history  # Reverses the preprocessing of the whole columns at once
+        results_df["True_Value"] = pipeline.inverse_transform_values("price_EUR", test_y.values)  # Adding true values
+        results_df["Prediction"] = pipeline.inverse_transform_values("price_EUR", test_preds).astype(int)  # Adding predictions
 
         # Display the generated dataset to the user
         st.write("Sample of Test Results:")
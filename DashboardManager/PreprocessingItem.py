@@ -23,16 +23,21 @@ class PreprocessingItem(DashboardItem):
                 st.write(f"The ``{threshold}%`` from both top and bottom were removed from ``{column}``.")
 
         elif self.preprocessing_type == PreprocessingTypes.LABEL_ENCODING:
-            column, mapping = self.action["column"], self.action["mapping"]
+            mapping = self.action["mapping"]
             st.write("#### Label Encoding")
-            st.write(f"The ``{column}`` was labeled. The mapping is:")
+            if "columns" in self.action:
+                # Several columns were encoded at once
+                st.write(f"The {self._columns_text()} were labeled. The mappings are:")
+            else:
+                st.write(f"The ``{self.action['column']}`` was labeled. The mapping is:")
             st.json(mapping, expanded=False)
 
         elif self.preprocessing_type == PreprocessingTypes.SCALING:
-            column, scaling_method = self.action["column"], self.action["scaling_method"]
+            scaling_method = self.action["scaling_method"]
 
             st.write("#### Numerical Parameter Scaling")
-            st.write(f"The ``{column}`` was scaled using ``{scaling_method}`` method.")
+            st.write(f"The {self._columns_text()} {'were' if 'columns' in self.action else 'was'} scaled using "
+                     f"``{scaling_method}`` method.")
 
         elif self.preprocessing_type == PreprocessingTypes.REMOVING_UNNEC_COLUMN:
             st.write("Some column was removed")
@@ -43,5 +48,10 @@ class PreprocessingItem(DashboardItem):
 
 
 
+    def _columns_text(self):
+        """The column(s) of the action, formatted for the text."""
+        columns = self.action["columns"] if "columns" in self.action else [self.action["column"]]
+        return ", ".join(f"``{column}``" for column in columns)
+
     def get_type(self) -> DashboardItemTypes:
         return DashboardItemTypes.PREPROCESSING_BOX
@@ -0,0 +1,65 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import forkserver, popen_forkserver, reduction, spawn, util
+from multiprocessing.context import ForkServerContext, ForkServerProcess, set_spawning_popen
+
+from DashboardManager.ChartRenderer import init_worker
+
+# The module, that is imported once by the fork server, so that every worker starts with the renderer loaded
+RENDERER_MODULE = "DashboardManager.ChartRenderer"
+
+
+class _RenderWorkerPopen(popen_forkserver.Popen):
+    """
+    Starts the worker from the fork server, as popen_forkserver.Popen does, but without the __main__ module of the
+    server: Streamlit installs the page script as __main__, and the worker would run the whole page once again to
+    import it. The workers get only the functions of the importable modules, so they do not need it.
+    """
+
+    def _launch(self, process_obj):
+        prep_data = spawn.get_preparation_data(process_obj._name)
+        prep_data.pop("init_main_from_path", None)
+        prep_data.pop("init_main_from_name", None)
+
+        buf = io.BytesIO()
+        set_spawning_popen(self)
+        try:
+            reduction.dump(prep_data, buf)
+            reduction.dump(process_obj, buf)
+        finally:
+            set_spawning_popen(None)
+
+        self.sentinel, w = forkserver.connect_to_new_process(self._fds)
+        # The duplicate of the write end of the pipe is the sentinel of the parent for the child
+        _parent_w = os.dup(w)
+        self.finalizer = util.Finalize(self, util.close_fds, (_parent_w, self.sentinel))
+        with open(w, "wb", closefd=True) as f:
+            f.write(buf.getbuffer())
+        self.pid = forkserver.read_signed(self.sentinel)
+
+
+class _RenderWorkerProcess(ForkServerProcess):
+    @staticmethod
+    def _Popen(process_obj):
+        return _RenderWorkerPopen(process_obj)
+
+
+class _RenderWorkerContext(ForkServerContext):
+    Process = _RenderWorkerProcess
+
+
+def create_render_pool(max_workers) -> ProcessPoolExecutor:
+    """
+    Creates the pool of the processes for rendering the charts (see ChartRenderer.draw_chart_in_worker()).
+
+    The workers are forked by the fork server - a clean process, that runs no threads and has never opened DuckDB,
+    so they do not inherit the connections and the locks of the server threads (as the workers, forked from the
+    server itself, would). The fork server imports the renderer, and it is started here, with the first worker,
+    and not on the first render; the other workers are forked from it on demand.
+    """
+    context = _RenderWorkerContext()
+    context.set_forkserver_preload([RENDERER_MODULE])
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=init_worker)
+    pool.submit(os.getpid).result()
+    return pool
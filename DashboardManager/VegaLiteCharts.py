@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from DashboardManager.DashboardManagerEnums import ChartTypes
+from Dataset.DatasetSchema import NUMERICAL_COLUMNS
+from Dataset.DatasetStatistics import CI_NONE, mean_confidence_intervals
+from Dataset.KernelDensity import kde
+from Dataset.QueryBackend import correlation_matrix, five_number_summaries, group_aggregate
+from Dataset.RunningAggregates import HISTOGRAM_BINS
+
+# The interactive charts are drawn by the browser (Vega-Lite) from the aggregated data, that is calculated here.
+# So the amount of data sent to the browser depends on these constants (and HISTOGRAM_BINS), and not on the amount
+# of rows
+SCATTER_BINS = (60, 40)  # The bins along the X and Y axes of the scatter density
+
+
+def _is_numeric(values):
+    return pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype)
+
+
+def _five_numbers(values: pd.Series) -> dict:
+    """The summary of the boxplot: quartiles and whiskers (the furthest values within 1.5 IQR from the box)."""
+    values = values.dropna()
+    q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    return {
+        "lower": values[values >= q1 - 1.5 * iqr].min(),
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "upper": values[values <= q3 + 1.5 * iqr].max(),
+    }
+
+
+def _boxplot_layers(x_encoding, value_title):
+    """Vega-Lite layers of the boxplot, drawn from the columns lower, q1, median, q3, upper."""
+    y = {"field": "lower", "type": "quantitative", "title": value_title}
+    return [
+        {"mark": "rule", "encoding": {**x_encoding, "y": y, "y2": {"field": "upper"}}},
+        {"mark": {"type": "bar", "size": 14},
+         "encoding": {**x_encoding, "y": {**y, "field": "q1"}, "y2": {"field": "q3"}}},
+        {"mark": {"type": "tick", "color": "white", "size": 14},
+         "encoding": {**x_encoding, "y": {**y, "field": "median"}}},
+    ]
+
+
+def build_chart(spec: dict, df):
+    """
+    Aggregates the data of the chart, and describes the chart as a Vega-Lite specification (for st.vega_lite_chart).
+
+    :param spec: The parameters of the chart (see ChartItem.get_spec()).
+    :param df: The DataFrame with (at least) the columns, that are shown on the chart.
+    :return: The aggregated data (DataFrame) and the Vega-Lite specification of the chart.
+    """
+    chart_type, x, y = spec["chart_type"], spec["x"], spec["y"]
+
+    if chart_type == ChartTypes.HISTOGRAM:
+        if _is_numeric(df[x]):
+            if spec.get("histogram") is not None:
+                counts, edges = spec["histogram"]
+            else:
+                counts, edges = np.histogram(df[x].dropna(), bins=HISTOGRAM_BINS)
+            data = pd.DataFrame({"start": edges[:-1], "end": edges[1:], "count": counts})
+            encoding = {"x": {"field": "start", "type": "quantitative", "bin": {"binned": True}, "title": x},
+                        "x2": {"field": "end"}}
+        else:
+            counts = spec["value_counts"] if spec.get("value_counts") is not None else df[x].value_counts()
+            data = pd.DataFrame({x: counts.index.astype(str), "count": counts.values})
+            encoding = {"x": {"field": x, "type": "nominal", "sort": "-y"}}
+        return data, {"mark": "bar", "encoding": {**encoding, "y": {"field": "count", "type": "quantitative"}}}
+
+    elif chart_type == ChartTypes.KDE:
+        grid, density = spec["kde"] if spec.get("kde") is not None else kde(df[x])
+        data = pd.DataFrame({x: grid, "density": density})
+        return data, {"mark": {"type": "area", "opacity": 0.5, "line": True},
+                      "encoding": {"x": {"field": x, "type": "quantitative"},
+                                   "y": {"field": "density", "type": "quantitative"}}}
+
+    elif chart_type == ChartTypes.BOXPLOT:
+        data = pd.DataFrame([{x: x, **_five_numbers(df[x])}])
+        return data, {"layer": _boxplot_layers({"x": {"field": x, "type": "nominal", "title": None}}, x)}
+
+    elif chart_type == ChartTypes.CATEGORICAL_BOXPLOTS:
+        # Sort the categories on the graph - from the highest median to lowest
+        summaries = spec.get("summaries")
+        if summaries is None:
+            summaries = five_number_summaries(df, x, y).sort_values("median", ascending=False, kind="stable")
+        data = summaries.reset_index(names=x)
+        data[x] = data[x].astype(str)
+        x_encoding = {"x": {"field": x, "type": "nominal", "sort": list(data[x])}}
+        return data, {"layer": _boxplot_layers(x_encoding, y)}
+
+    elif chart_type == ChartTypes.SCATTER:
+        # The density of the points instead of the points themselves: the amount of rows in every cell of the grid
+        # (categorical axes are not binned - every category is its own cell)
+        cells = {}
+        for axis, name, bins in (("x", x, SCATTER_BINS[0]), ("y", y, SCATTER_BINS[1])):
+            if _is_numeric(df[name]):
+                values = df[name].to_numpy(dtype=np.float64)
+                edges = np.histogram_bin_edges(values[~np.isnan(values)], bins=bins)
+                index = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, bins - 1)
+                cells[axis] = pd.Series(np.where(np.isnan(values), np.nan, (edges[index] + edges[index + 1]) / 2))
+            else:
+                cells[axis] = pd.Series(df[name].astype(str).to_numpy())
+        data = pd.DataFrame(cells).dropna().groupby(["x", "y"]).size().reset_index(name="count")
+        return data, {"mark": "circle", "encoding": {
+            "x": {"field": "x", "type": "quantitative" if _is_numeric(df[x]) else "nominal", "title": x},
+            "y": {"field": "y", "type": "quantitative" if _is_numeric(df[y]) else "nominal", "title": y},
+            "size": {"field": "count", "type": "quantitative"},
+            "color": {"field": "count", "type": "quantitative", "scale": {"type": "log"}},
+            "tooltip": [{"field": "count", "type": "quantitative"}]}}
+
+    elif chart_type in (ChartTypes.LINE, ChartTypes.BAR):
+        moments = spec.get("moments")
+        means = group_aggregate(df, x, y, "mean") if moments is None else moments["mean"]
+        data = pd.DataFrame({x: means.index, y: means.values})
+        x_type = "quantitative" if _is_numeric(df[x]) and chart_type == ChartTypes.LINE else "nominal"
+        if x_type == "nominal":
+            data[x] = data[x].astype(str)
+        x_encoding = {"field": x, "type": x_type}
+        layers = [{"mark": {"type": "line", "point": True} if chart_type == ChartTypes.LINE else "bar",
+                   "encoding": {"x": x_encoding, "y": {"field": y, "type": "quantitative", "title": f"mean of {y}"}}}]
+
+        # The analytic confidence intervals (the bootstrapped ones need all the rows, so they are not drawn here)
+        if moments is not None and spec["ci_method"] != CI_NONE:
+            errors = mean_confidence_intervals(moments, spec["ci_method"]).to_numpy()
+            data["ci_lower"], data["ci_upper"] = means.values - errors, means.values + errors
+            interval = {"x": x_encoding, "y": {"field": "ci_lower", "type": "quantitative"},
+                        "y2": {"field": "ci_upper"}}
+            if chart_type == ChartTypes.LINE:
+                layers.insert(0, {"mark": {"type": "area", "opacity": 0.2}, "encoding": interval})
+            else:
+                layers.append({"mark": {"type": "rule", "color": "#424242"}, "encoding": interval})
+        return data, {"layer": layers}
+
+    elif chart_type == ChartTypes.CORRELATION_HEATMAP:
+        matrix = spec.get("correlation")
+        if matrix is None:
+            matrix = correlation_matrix(df, NUMERICAL_COLUMNS)  # Only numerical params can be used here
+        data = matrix.rename_axis("row").reset_index().melt(id_vars="row", var_name="column", value_name="correlation")
+        encoding = {"x": {"field": "column", "type": "nominal", "sort": NUMERICAL_COLUMNS, "title": None},
+                    "y": {"field": "row", "type": "nominal", "sort": NUMERICAL_COLUMNS, "title": None}}
+        return data, {"encoding": encoding, "layer": [
+            {"mark": "rect", "encoding": {"color": {"field": "correlation", "type": "quantitative",
+                                                    "scale": {"scheme": "redblue", "domain": [-1, 1],
+                                                              "reverse": True}}}},
+            {"mark": "text", "encoding": {"text": {"field": "correlation", "type": "quantitative",
+                                                   "format": ".2f"}}},
+        ]}
+
+    raise ValueError(f"The chart_type of ChartItem object is unknown. Got: {chart_type}")
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+# The columns of the initial dataset, that are not related to autos
+IRRELEVANT_COLUMNS = ['ab_test', 'date_crawled', 'last_seen', 'ad_created', 'car_name', 'registration_month',
+                      'Unnamed: 0']
+CATEGORICAL_COLUMNS = ['vehicle_type', 'transmission', 'model', 'fuel_type', 'brand', 'unrepaired_damage']
+NON_NUMERICAL_COLUMNS = CATEGORICAL_COLUMNS + ['postal_code']
+
+# All the columns minus non-numerical
+NUMERICAL_COLUMNS = ["price_EUR", "registration_year", "power_ps", "odometer_km"]
+
+# The kinds of columns in the declared schema
+CATEGORY = "category"  # pandas "category" dtype with one fixed dictionary, shared by all the frames of the app
+INTEGER = "integer"  # downcast to the smallest of INTEGER_DTYPES that fits the range of values
+FLOAT = "float"  # stored as float32
+
+INTEGER_DTYPES = [np.int16, np.int32, np.int64]
+
+# How every column of the prepared dataset is stored in memory
+COLUMN_SCHEMA = {
+    **{column: CATEGORY for column in CATEGORICAL_COLUMNS},
+    **{column: INTEGER for column in NUMERICAL_COLUMNS},
+    "postal_code": INTEGER,
+}
+
+
+def _smallest_integer_dtype(values: pd.Series):
+    """Returns the smallest integer dtype that can hold all the values, or None if the values are not integers."""
+    if values.isna().any():
+        return None
+
+    mini, maxi = values.min(), values.max()
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= mini and maxi <= info.max:
+            return dtype
+    return None
+
+
+def _column_dtype(values: pd.Series, kind: str):
+    """Chooses the compact dtype for the column of the given kind, based on its values."""
+    if kind == CATEGORY:
+        # The dictionary is sorted, so the category codes are the same as after .astype("category")
+        return pd.CategoricalDtype(categories=sorted(values.dropna().unique()))
+
+    elif kind == INTEGER:
+        dtype = _smallest_integer_dtype(values)
+        if dtype is not None:
+            return np.dtype(dtype)
+
+        # Missing values cannot be stored in numpy integers. float32 keeps integers exactly only up to 2^24
+        if values.abs().max() < 2 ** 24:
+            return np.dtype(np.float32)
+        return np.dtype(np.float64)
+
+    elif kind == FLOAT:
+        return np.dtype(np.float32)
+
+    else:
+        raise ValueError(f"Unknown kind of column in the dataset schema: {kind}")
+
+
+def infer_dtypes(df: pd.DataFrame, schema=None) -> dict:
+    """
+    Chooses the compact dtypes for the columns of the dataset according to the declared schema.
+
+    :param df: The dataset (or one chunk of it), as it was read from the source.
+    :param schema: Mapping of the column names to CATEGORY, INTEGER or FLOAT. COLUMN_SCHEMA by default.
+    :return: Mapping of the column names to dtypes; the columns that are not mentioned in the schema are skipped.
+    """
+    schema = COLUMN_SCHEMA if schema is None else schema
+    return {column: _column_dtype(df[column], kind) for column, kind in schema.items() if column in df.columns}
+
+
+def merge_dtypes(dtypes: dict, other: dict) -> dict:
+    """
+    Merges the dtypes, inferred from two different chunks of the dataset, into the dtypes that fit both of them:
+    the dictionaries of categories are united, and numerical types are widened if needed.
+    """
+    merged = {}
+    for column in dtypes.keys() | other.keys():
+        if column not in dtypes or column not in other:
+            merged[column] = dtypes.get(column, other.get(column))
+        elif isinstance(dtypes[column], pd.CategoricalDtype):
+            categories = set(dtypes[column].categories) | set(other[column].categories)
+            merged[column] = pd.CategoricalDtype(categories=sorted(categories))
+        else:
+            merged[column] = np.promote_types(dtypes[column], other[column])
+    return merged
+
+
+def apply_schema(df: pd.DataFrame, schema=None, dtypes=None) -> pd.DataFrame:
+    """
+    Converts the columns of the dataset to the compact dtypes of the declared schema.
+
+    :param df: The dataset, as it was read from the source.
+    :param schema: Mapping of the column names to CATEGORY, INTEGER or FLOAT. COLUMN_SCHEMA by default.
+    :param dtypes: Already chosen dtypes (e.g. for all the chunks of a large dataset). Inferred from df by default.
+    :return: New DataFrame; the columns that are not mentioned in the schema are kept as they are.
+    """
+    dtypes = infer_dtypes(df, schema) if dtypes is None else dtypes
+
+    return df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+
+
+def conform_to_schema(df: pd.DataFrame, reference: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts the new rows (e.g. fake data) to the dtypes of the dataset they are going to be appended to, so that
+    the concatenation keeps categorical columns categorical and numerical columns compact.
+
+    :param df: The new rows.
+    :param reference: The dataset, to which the rows are going to be appended.
+    """
+    converted = {}
+    for column in df.columns.intersection(reference.columns):
+        dtype = reference[column].dtype
+
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Values outside the fixed dictionary would silently become NaN, so such column is left as it is
+            if df[column].dropna().isin(dtype.categories).all():
+                converted[column] = df[column].astype(dtype)
+
+        elif np.issubdtype(dtype, np.integer):
+            if pd.api.types.is_integer_dtype(df[column]) and len(df[column]) and \
+                    np.iinfo(dtype).min <= df[column].min() and df[column].max() <= np.iinfo(dtype).max:
+                converted[column] = df[column].astype(dtype)
+
+        elif np.issubdtype(dtype, np.floating) and pd.api.types.is_numeric_dtype(df[column]):
+            converted[column] = df[column].astype(dtype)
+
+    return df.assign(**converted)
+
+
+def column_memory_usage(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the dtype and the amount of bytes used by every column of the dataset."""
+    return pd.DataFrame({
+        "dtype": df.dtypes.astype(str),
+        "bytes": df.memory_usage(index=False, deep=True),
+    })
@@ -0,0 +1,255 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from Dataset.KernelDensity import binned_kde, scott_bandwidth
+from Dataset.QueryBackend import correlation_matrix, five_number_summaries, group_aggregate, group_moments, quantiles
+from Dataset.RunningAggregates import HISTOGRAM_BINS, RunningAggregates
+from Dataset.SessionDataset import SessionDataset
+
+# The methods of the 95% confidence intervals of the means on the bar and line charts. The bootstrap is done by
+# seaborn from the rows themselves, the others are calculated from the group moments (see mean_confidence_intervals())
+CI_BOOTSTRAP = "Bootstrap"
+CI_NORMAL = "Normal"
+CI_STUDENT_T = "Student's t"
+CI_NONE = "None"
+CI_METHODS = [CI_BOOTSTRAP, CI_NORMAL, CI_STUDENT_T, CI_NONE]
+
+_NORMAL_95 = 1.959963984540054  # The 97.5% quantile of the standard normal distribution
+_STUDENT_T_95 = {1: 12.7062047, 2: 4.30265273, 3: 3.18244631, 4: 2.77644511}  # The same of t, for a few samples
+
+
+def _student_t_95(dof):
+    """
+    The 97.5% quantiles of Student's t distribution with the given degrees of freedom (an array). Above 4 degrees
+    of freedom the Cornish-Fisher expansion around the normal quantile is used - its error is below 0.0003.
+    """
+    z = _NORMAL_95
+    terms = [(z ** 3 + z) / 4,
+             (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96,
+             (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384,
+             (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160]
+    dof = np.asarray(dof, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        quantile = z + sum(term / dof ** (i + 1) for i, term in enumerate(terms))
+    for small_dof, exact in _STUDENT_T_95.items():
+        quantile = np.where(dof == small_dof, exact, quantile)
+    return np.where(dof >= 1, quantile, np.nan)
+
+
+def mean_confidence_intervals(moments: pd.DataFrame, method) -> pd.Series:
+    """
+    The half-widths of the 95% confidence intervals of the group means, from their moments (see
+    DatasetStatistics.group_moments()). The groups with less than 2 values have no interval (NaN).
+
+    :param method: CI_NORMAL or CI_STUDENT_T.
+    """
+    standard_error = np.sqrt(moments["var"] / moments["count"])
+    if method == CI_NORMAL:
+        return standard_error * _NORMAL_95
+    elif method == CI_STUDENT_T:
+        return standard_error * _student_t_95(moments["count"] - 1)
+    raise ValueError(f"Unknown method of the confidence intervals: {method}")
+
+
+class DatasetStatistics:
+    """
+    The summary statistics of one dataset (the shared DataFrame or the SessionDataset of a session), that are
+    calculated once and then served from the cache - to the charts, the preprocessing actions and the pages.
+
+    Every statistic is stored together with the version of the columns, from which it was calculated (see
+    SessionDataset.version(); a plain DataFrame is never changed, so its version is always 0). So the edit of a
+    column makes only the statistics of that column outdated, and after undo (or reset) the statistics of the
+    restored state are found in the cache again. The least recently used statistics are dropped first.
+    The returned values are shared by all the callers, so they must be treated as read-only.
+
+    When the rows are appended through append_rows(), the running aggregates of the dataset (see
+    Dataset/RunningAggregates.py) are updated with them, so the count, mean, std, min, max, histograms, category
+    counts and correlations of the new state are not calculated from all the rows again.
+    """
+
+    def __init__(self, source, max_entries=256):
+        """
+        :param source: The DataFrame or SessionDataset, whose statistics are calculated.
+        :param max_entries: The amount of statistics, that are kept in the cache.
+        """
+        self.source = source
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (statistic, columns, params, version) -> value, oldest first
+        self._running = None  # (version of the whole dataset, its RunningAggregates), see append_rows()
+        self._lock = threading.Lock()  # The statistics of the shared dataset are used by all the sessions
+
+    def _version(self, columns):
+        return self.source.version(columns) if isinstance(self.source, SessionDataset) else 0
+
+    def _frame(self, columns) -> pd.DataFrame:
+        """Only the given columns of the dataset (the SessionDataset is not materialised as the whole)."""
+        if isinstance(self.source, SessionDataset):
+            return pd.DataFrame({name: self.source.column(name) for name in dict.fromkeys(columns)})
+        return self.source[list(dict.fromkeys(columns))]
+
+    def _aggregates(self, numerical=(), categorical=()):
+        """The running aggregates of the current state of the dataset, if they have the columns (otherwise None)."""
+        running = self._running
+        if running is None or running[0] != self._version(None):
+            return None
+        aggregates = running[1]
+        if all(name in aggregates.numerical_columns for name in numerical) and \
+                all(name in aggregates.categorical_columns for name in categorical):
+            return aggregates
+        return None
+
+    def append_rows(self, rows: pd.DataFrame):
+        """
+        Appends the rows to the SessionDataset (see SessionDataset.append_rows()), and updates the running
+        aggregates with them in O(rows). The aggregates are created from all the rows at the first append (or
+        after any other edit of the dataset).
+        """
+        aggregates = self._aggregates()
+        if aggregates is None:
+            aggregates = RunningAggregates.from_frame(self.source.frame)
+        self.source.append_rows(rows)
+        aggregates.update(rows)
+        self._running = self._version(None), aggregates
+
+    def _get(self, statistic, columns, params, calculate):
+        key = statistic, tuple(columns), params, self._version(columns)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        # Calculated outside the lock - two sessions can calculate the same statistic at once, but the result is
+        # the same, and the other statistics are not blocked meanwhile
+        value = calculate()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def quantiles(self, column, qs) -> list:
+        """The quantiles of the column (the same as df[column].quantile(qs).tolist())."""
+        return self._get("quantiles", [column], tuple(qs), lambda: quantiles(self._frame([column]), column, qs))
+
+    def min_max(self, column):
+        """The smallest and the largest value of the column."""
+        def calculate():
+            aggregates = self._aggregates(numerical=[column])
+            if aggregates is not None:
+                return aggregates.min_max(column)
+            values = self._frame([column])[column]
+            return values.min(), values.max()
+
+        return self._get("min_max", [column], None, calculate)
+
+    def mean_std(self, column):
+        """The mean and the (sample) standard deviation of the column."""
+        def calculate():
+            aggregates = self._aggregates(numerical=[column])
+            if aggregates is not None:
+                return aggregates.mean_std(column)
+            values = self._frame([column])[column]
+            return values.mean(), values.std()
+
+        return self._get("mean_std", [column], None, calculate)
+
+    def count(self, column):
+        """The amount of the known (not missing) values of the column."""
+        def calculate():
+            aggregates = self._aggregates(numerical=[column])
+            if aggregates is not None:
+                return aggregates.count(column)
+            return int(self._frame([column])[column].count())
+
+        return self._get("count", [column], None, calculate)
+
+    def histogram(self, column):
+        """
+        The histogram of the numerical column in HISTOGRAM_BINS equal bins between its smallest and largest value.
+        It is kept by the running aggregates (see append_rows()), and if they are not in use (or some appended values
+        are outside of their bins), the values are binned the same way here, so the chart always has the same bins.
+
+        :return: The counts of the bins and their edges.
+        """
+        def calculate():
+            aggregates = self._aggregates(numerical=[column])
+            histogram = None if aggregates is None else aggregates.histogram(column)
+            if histogram is None:
+                histogram = np.histogram(self._frame([column])[column].dropna(), bins=HISTOGRAM_BINS)
+            return histogram
+
+        return self._get("histogram", [column], None, calculate)
+
+    def value_counts(self, column, normalize=False) -> pd.Series:
+        """The amount (or the share, if normalize) of the rows of every category of the column."""
+        def calculate():
+            aggregates = self._aggregates(categorical=[column])
+            if aggregates is not None:
+                return aggregates.value_counts(column, normalize)
+            counts = self._frame([column])[column].value_counts(normalize=normalize)
+            return counts[counts > 0]  # Without the unused categories
+
+        return self._get("value_counts", [column], normalize, calculate)
+
+    def kde(self, column):
+        """
+        The kernel density of the column (see KernelDensity.binned_kde()). The bandwidth and the range of the grid
+        are taken from the cached statistics of the column, so only the binning goes through the values.
+
+        :return: The points of the grid and the density in them.
+        """
+        def calculate():
+            values = self._frame([column])[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            low, high = self.min_max(column)
+            bandwidth = scott_bandwidth(self.count(column), self.mean_std(column)[1])
+            return binned_kde(values, bandwidth, low, high)
+
+        return self._get("kde", [column], None, calculate)
+
+    def unique_values(self, column) -> list:
+        """The sorted list of the different values of the column (e.g. the options of a selectbox)."""
+        return self._get("unique_values", [column], None, lambda: sorted(set(self._frame([column])[column])))
+
+    def group_aggregate(self, by, column, func="median") -> pd.Series:
+        """The aggregate of the column for every group (see QueryBackend.group_aggregate())."""
+        return self._get("group_aggregate", [by, column], func,
+                         lambda: group_aggregate(self._frame([by, column]), by, column, func))
+
+    def group_moments(self, by, column) -> pd.DataFrame:
+        """The count, mean and variance of the column for every group (see QueryBackend.group_moments())."""
+        return self._get("group_moments", [by, column], None,
+                         lambda: group_moments(self._frame([by, column]), by, column))
+
+    def boxplot_summaries(self, by, column) -> pd.DataFrame:
+        """The quartiles and whiskers of the column for every group (see QueryBackend.five_number_summaries())."""
+        return self._get("boxplot_summaries", [by, column], None,
+                         lambda: five_number_summaries(self._frame([by, column]), by, column))
+
+    def correlation_matrix(self, columns) -> pd.DataFrame:
+        """The Pearson correlation of the columns (the same as df[columns].corr())."""
+        columns = list(columns)
+
+        def calculate():
+            aggregates = self._aggregates(numerical=columns)
+            if aggregates is not None:
+                return aggregates.correlation_matrix(columns)
+            return correlation_matrix(self._frame(columns), columns)
+
+        return self._get("correlation_matrix", columns, None, calculate)
+
+    def stats(self):
+        """The counters of the cache, e.g. for showing them on the page."""
+        requests = self.hits + self.misses
+        return {
+            "statistics": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
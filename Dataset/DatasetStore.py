@@ -0,0 +1,111 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from Dataset.DatasetSchema import IRRELEVANT_COLUMNS, apply_schema, infer_dtypes, merge_dtypes
+
+# The amount of CSV rows, that are read into memory at once during the ingestion
+INGESTION_CHUNK_ROWS = 500_000
+
+
+def _read_csv_in_chunks(csv_path, chunk_rows):
+    return pd.read_csv(csv_path, usecols=lambda column: column not in IRRELEVANT_COLUMNS, chunksize=chunk_rows)
+
+
+def ingest_csv(csv_path, store_dir, chunk_rows=INGESTION_CHUNK_ROWS):
+    """
+    Converts the CSV file of any size into the partitioned columnar store (directory with Parquet files), without
+    ever holding more than one chunk of it in memory.
+
+    The CSV is read twice: the first pass only chooses the dtypes of the declared schema for the whole file (the
+    shared dictionaries of categories and the ranges of numbers), and the second pass converts every chunk to these
+    dtypes and writes it as a separate partition.
+
+    :param csv_path: Path to the CSV file with the same columns as the Kaggle dataset.
+    :param store_dir: The directory to be created. It appears atomically, when all the partitions are written.
+    :param chunk_rows: The amount of rows in one chunk (and in one partition).
+    """
+    dtypes = None
+    for chunk in _read_csv_in_chunks(csv_path, chunk_rows):
+        dtypes = infer_dtypes(chunk) if dtypes is None else merge_dtypes(dtypes, infer_dtypes(chunk))
+
+    tmp_dir = f"{store_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for i, chunk in enumerate(_read_csv_in_chunks(csv_path, chunk_rows)):
+        apply_schema(chunk, dtypes=dtypes).to_parquet(os.path.join(tmp_dir, f"part-{i:05d}.parquet"), index=False)
+
+    try:
+        os.rename(tmp_dir, store_dir)
+    except OSError:
+        # Another process has ingested the same file at the same time - use its store
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def range_filter(column, lower=None, upper=None):
+    """Filter expression for DatasetStore: lower <= column <= upper (any of the bounds can be omitted)."""
+    expression = pc.field(column).is_valid()
+    if lower is not None:
+        expression &= pc.field(column) >= lower
+    if upper is not None:
+        expression &= pc.field(column) <= upper
+    return expression
+
+
+class DatasetStore:
+    """
+    Read access to the partitioned columnar store, created by ingest_csv().
+    Only the requested columns (and the row groups that can match the filter) are read from the disk, so the store
+    can be much larger than the memory.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.dataset = ds.dataset(store_dir, format="parquet")
+
+    def count_rows(self, filter=None):
+        return self.dataset.count_rows(filter=filter)
+
+    def read(self, columns=None, filter=None) -> pd.DataFrame:
+        """
+        Loads the part of the store into the memory.
+
+        :param columns: The columns to read (all by default).
+        :param filter: pyarrow expression, e.g. range_filter("price_EUR", upper=10000).
+        """
+        table = self.dataset.to_table(columns=columns, filter=filter)
+        return table.unify_dictionaries().to_pandas()
+
+    def sample(self, max_rows, columns=None, seed=42) -> pd.DataFrame:
+        """Loads the uniform random sample of at most (approximately) max_rows rows, reading the store batch by batch."""
+        total_rows = self.count_rows()
+        if total_rows <= max_rows:
+            return self.read(columns)
+
+        fraction = max_rows / total_rows
+        rng = np.random.default_rng(seed)
+        batches = [
+            batch.filter(pa.array(rng.random(batch.num_rows) < fraction))
+            for batch in self.dataset.to_batches(columns=columns)
+        ]
+        table = pa.Table.from_batches(batches, schema=batches[0].schema)
+        return table.unify_dictionaries().to_pandas()
+
+    def quantile(self, column, q, filter=None):
+        """Exact quantile(s) of the column. Only this one column is loaded into the memory."""
+        values = self.dataset.to_table(columns=[column], filter=filter).column(column).to_numpy()
+        return np.nanquantile(values.astype(np.float64), q)
+
+    def value_counts(self, column, filter=None) -> pd.Series:
+        """The amount of rows per value of the column, counted batch by batch."""
+        counts = pd.Series(dtype=np.int64)
+        for batch in self.dataset.to_batches(columns=[column], filter=filter):
+            batch_counts = pc.value_counts(batch.column(0)).to_pandas()
+            batch_counts = pd.Series(batch_counts.map(lambda x: x["counts"]).values,
+                                     index=batch_counts.map(lambda x: x["values"]).values)
+            counts = counts.add(batch_counts, fill_value=0)
+        return counts.astype(np.int64).sort_values(ascending=False)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# The year, in which the dataset was crawled from eBay
+DATASET_YEAR = 2016
+
+# The postal codes, that are not German, get this region instead of the 1st digit
+OTHER_POSTAL_REGION = 10
+
+POWER_BANDS = [0, 75, 110, 150, 200, np.inf]
+POWER_BAND_LABELS = ["< 75 PS", "75-109 PS", "110-149 PS", "150-199 PS", ">= 200 PS"]
+
+MILEAGE_BANDS = [0, 50000, 100000, 150000, np.inf]
+MILEAGE_BAND_LABELS = ["< 50k km", "50k-99k km", "100k-149k km", ">= 150k km"]
+
+
+def postal_region(postal_codes: pd.Series) -> np.ndarray:
+    """The 1st digit of the German postal code represents the region; leading zeros are lost in the dataset."""
+    codes = pd.to_numeric(postal_codes, errors="coerce").to_numpy(dtype=np.float64)
+    is_german = (codes >= 1000) & (codes <= 99999)
+    return np.where(is_german, codes // 10000, OTHER_POSTAL_REGION).astype(np.int8)
+
+
+def vehicle_age(registration_years: pd.Series) -> np.ndarray:
+    """The age in the year of the crawl; the registration years after it are errors, so their age is missing."""
+    years = pd.to_numeric(registration_years, errors="coerce").to_numpy(dtype=np.float64)
+    return np.where(years <= DATASET_YEAR, DATASET_YEAR - years, np.nan).astype(np.float32)
+
+
+def power_band(power_ps: pd.Series) -> pd.Categorical:
+    return pd.cut(power_ps, POWER_BANDS, labels=POWER_BAND_LABELS, right=False).array
+
+
+def mileage_band(odometer_km: pd.Series) -> pd.Categorical:
+    return pd.cut(odometer_km, MILEAGE_BANDS, labels=MILEAGE_BAND_LABELS, right=False).array
+
+
+# Every derived feature: name -> (source column, vectorized function of the source column)
+DERIVED_FEATURES = {
+    "postal_region": ("postal_code", postal_region),
+    "vehicle_age": ("registration_year", vehicle_age),
+    "power_band": ("power_ps", power_band),
+    "mileage_band": ("odometer_km", mileage_band),
+}
+
+
+def derive_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculates all the DERIVED_FEATURES for the dataset in one vectorized pass per feature.
+    It is done once, when the dataset is prepared, and the result is cached together with the dataset (see
+    helpers.load_derived_features()).
+
+    :return: DataFrame with the derived features, aligned with the rows of df.
+    """
+    return pd.DataFrame(
+        {name: func(df[source]) for name, (source, func) in DERIVED_FEATURES.items()},
+        index=df.index
+    )
@@ -0,0 +1,62 @@
+import numpy as np
+
+# The density is calculated on the regular grid of this amount of points, so its cost depends on the amount of rows
+# only through the binning (one pass over the values)
+KDE_GRID_SIZE = 512
+KDE_CUT = 3  # How far (in bandwidths) the grid reaches beyond the smallest and the largest value, as in seaborn
+
+
+def scott_bandwidth(count, std):
+    """The bandwidth of the Gaussian kernel by Scott's rule (the same, that sns.kdeplot() uses by default)."""
+    bandwidth = std * count ** (-1 / 5) if count > 1 else np.nan
+    # All the values are the same (or there is only one of them) - draw them as a narrow peak
+    return bandwidth if bandwidth > 0 else 1.0
+
+
+def binned_kde(values, bandwidth, low, high, grid_size=KDE_GRID_SIZE):
+    """
+    The Gaussian kernel density estimate of the values: they are distributed (linearly) among the nearest points of
+    the regular grid, and the counts are convolved with the kernel by FFT. The result differs from the exact KDE
+    much less than the line width, and it costs O(rows + grid_size * log(grid_size)) instead of O(rows * grid_size).
+
+    :param values: numpy array of the values (the missing ones are skipped).
+    :param bandwidth: The standard deviation of the kernel (see scott_bandwidth()).
+    :param low: The smallest value, and
+    :param high: the largest one - the grid reaches KDE_CUT bandwidths beyond them.
+    :return: The points of the grid and the density in them.
+    """
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.array([]), np.array([])
+
+    grid = np.linspace(low - KDE_CUT * bandwidth, high + KDE_CUT * bandwidth, grid_size)
+    step = grid[1] - grid[0]
+
+    # Linear binning: every value is split between the two nearest points of the grid
+    position = (values - grid[0]) / step
+    index = np.clip(np.floor(position).astype(np.int64), 0, grid_size - 2)
+    fraction = position - index
+    counts = np.bincount(index, 1 - fraction, grid_size) + np.bincount(index + 1, fraction, grid_size)
+
+    # The kernel is cut at 5 bandwidths (or at the size of the grid), where it is practically zero
+    reach = int(min(grid_size - 1, np.ceil(5 * bandwidth / step)))
+    offsets = np.arange(-reach, reach + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+
+    size = 1 << int(np.ceil(np.log2(grid_size + 2 * reach + 1)))
+    convolved = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = np.maximum(convolved[reach:reach + grid_size], 0) / len(values)
+    return grid, density
+
+
+def kde(values):
+    """
+    The kernel density of the pandas Series (see binned_kde()), with the bandwidth by Scott's rule.
+    (DatasetStatistics.kde() does the same with the cached statistics of the column.)
+    """
+    values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    known = values[~np.isnan(values)]
+    if len(known) == 0:
+        return np.array([]), np.array([])
+    bandwidth = scott_bandwidth(len(known), known.std(ddof=1) if len(known) > 1 else 0.0)
+    return binned_kde(known, bandwidth, known.min(), known.max())
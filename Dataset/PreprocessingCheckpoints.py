@@ -0,0 +1,110 @@
+import pandas as pd
+
+from DashboardManager.DashboardManagerEnums import DashboardItemTypes
+
+
+class _Checkpoint:
+    """The state of the session after one preprocessing step (or after appending the fake rows)."""
+
+    def __init__(self, dataset_snapshot, history, item, fake_rows):
+        self.dataset_snapshot = dataset_snapshot  # SessionDataset.snapshot()
+        self.history = history  # PreprocessingPipeline, that is never extended (a copy is given out)
+        # PreprocessingItem, that shows this step on the page 3 (None for the initial state and the fake rows)
+        self.item = item
+        self.fake_rows = fake_rows  # All the fake rows, generated up to this step (never modified in place)
+
+
+class PreprocessingCheckpoints:
+    """
+    Checkpoints of the preprocessing on the page 3: the state of the session dataset, of the preprocessing history and
+    the PreprocessingItem after every executed action. Any of them can be brought back in O(1), without re-reading
+    the dataset or executing the actions again - this is how undo, redo and "go back to the step N" work.
+
+    The snapshots of the dataset keep only the references to the edited columns (see SessionDataset.snapshot()),
+    so all the checkpoints together take about as much memory as the edits themselves.
+    When a new action is executed after going back, the checkpoints after the current one are discarded, and the
+    history continues from this step (a new branch).
+
+    Appending the fake rows (page 4) is a step as well: the appended rows are stored in the dataset in the form of
+    the current step (encoded, scaled, ...), so they can not be carried over to the other steps - going back before
+    the append removes them, and redo brings them back.
+    """
+
+    def __init__(self, dataset, history, fake_rows=None):
+        fake_rows = pd.DataFrame() if fake_rows is None else fake_rows
+        self._checkpoints = [_Checkpoint(dataset.snapshot(), history.copy(), None, fake_rows)]
+        self.position = 0  # The index of the checkpoint, which is the current state
+
+    def __len__(self):
+        return len(self._checkpoints)
+
+    @property
+    def fake_rows(self):
+        """The fake rows of the current step (see helpers.append_fake_rows())."""
+        return self._checkpoints[self.position].fake_rows
+
+    def record(self, dataset, history, item, fake_rows=None):
+        """
+        Saves the state after the action, that was just executed, as the next step.
+
+        :param item: PreprocessingItem of the action, or None if the action was appending of the fake rows.
+        :param fake_rows: All the fake rows after the action (the ones of the current step by default).
+        """
+        fake_rows = self.fake_rows if fake_rows is None else fake_rows
+        del self._checkpoints[self.position + 1:]
+        self._checkpoints.append(_Checkpoint(dataset.snapshot(), history.copy(), item, fake_rows))
+        self.position += 1
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self._checkpoints) - 1
+
+    def step_names(self):
+        """Short descriptions of all the steps, for choosing one of them."""
+        names = ["Initial dataset"]
+        for previous, checkpoint in zip(self._checkpoints, self._checkpoints[1:]):
+            if checkpoint.item is None:
+                names.append(f"Appending of {len(checkpoint.fake_rows) - len(previous.fake_rows)} fake rows")
+                continue
+            action = checkpoint.item.action
+            columns = ", ".join(action["columns"]) if "columns" in action else action.get("column")
+            names.append(f"{checkpoint.item.preprocessing_type.value} of {columns}")
+        return names
+
+    def checkout(self, step, dataset, manager):
+        """
+        Brings the session back to the state after the given step. Its fake rows are then given by fake_rows.
+
+        :param step: The index of the step (0 is the initial dataset).
+        :param dataset: SessionDataset of the session; it is restored in place, so that the charts, bound to it,
+                        show the restored state.
+        :param manager: DashboardManager with the preprocessing history on the page 3. The items of the steps after
+                        the given one are removed from it, and the items of the redone steps are added back.
+        :return: The preprocessing history of the restored state (a copy, that can be extended).
+        """
+        if not 0 <= step < len(self._checkpoints):
+            raise ValueError(f"There is no preprocessing step {step}. Expected 0 to {len(self._checkpoints) - 1}.")
+
+        checkpoint = self._checkpoints[step]
+        dataset.restore(checkpoint.dataset_snapshot)
+        self.position = step
+
+        # Show only the preprocessing actions up to the restored step. Text boxes are kept where they are
+        active_items = [c.item for c in self._checkpoints[1:step + 1] if c.item is not None]
+        for item_id, item in list(manager.items.items()):
+            if item.get_type() == DashboardItemTypes.PREPROCESSING_BOX and \
+                    not any(item is active for active in active_items):
+                manager.remove_item(item_id)
+        for item in active_items:
+            if not any(item is shown for shown in manager.items.values()):
+                manager.items[max(manager.items, default=-1) + 1] = item
+
+        return checkpoint.history.copy()
+
+    def undo(self, dataset, manager):
+        return self.checkout(self.position - 1, dataset, manager)
+
+    def redo(self, dataset, manager):
+        return self.checkout(self.position + 1, dataset, manager)
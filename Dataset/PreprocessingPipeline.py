@@ -0,0 +1,155 @@
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from DashboardManager.DashboardManagerEnums import PreprocessingTypes
+
+
+class _ScalingStep:
+    """Scaling of a numerical column: x -> (x - offset) / scale."""
+
+    def __init__(self, offset, scale):
+        self.offset = offset
+        self.scale = scale
+
+    def transform(self, values):
+        return (np.asarray(values, dtype=np.float64) - self.offset) / self.scale
+
+    def inverse_transform(self, values):
+        return np.asarray(values, dtype=np.float64) * self.scale + self.offset
+
+
+class _LabelEncodingStep:
+    """Label encoding of a categorical column with the mapping {code: value}, as it is saved in the history."""
+
+    def __init__(self, mapping):
+        # The keys become strings, when the history is loaded from JSON
+        codes = sorted((int(code), value) for code, value in mapping.items())
+        self.categories = pd.Index([value for _, value in codes])
+        self.codes = np.array([code for code, _ in codes], dtype=np.int64)
+
+    def transform(self, values):
+        """Unknown values get the code -1, the same as missing values in the encoded dataset."""
+        positions = self.categories.get_indexer(pd.Index(np.asarray(values, dtype=object).ravel()))
+        return np.where(positions >= 0, self.codes[positions], -1)
+
+    def inverse_transform(self, values):
+        """Values, that are not codes of the mapping (e.g. -1 or not whole numbers), become NaN."""
+        values = np.asarray(values, dtype=np.float64)
+        positions = np.clip(np.searchsorted(self.codes, values), 0, len(self.codes) - 1)
+        known = self.codes[positions] == values
+        return np.where(known, self.categories.to_numpy(dtype=object)[positions], np.nan)
+
+
+# The parameters of the batch action (on several "columns" at once), that are saved per column: {column: value}
+PER_COLUMN_PARAMS = ["mapping", "min", "max", "mean", "std"]
+
+
+def split_batch_action(action: dict) -> list:
+    """
+    Splits the action on several columns at once into the equivalent actions on one column each.
+    The action on one column is returned as it is (in the list).
+    """
+    if "columns" not in action:
+        return [action]
+
+    single_actions = []
+    for column in action["columns"]:
+        single_action = {key: value for key, value in action.items() if key != "columns"}
+        single_action["column"] = column
+        for param in PER_COLUMN_PARAMS:
+            if param in action:
+                single_action[param] = action[param][column]
+        single_actions.append(single_action)
+    return single_actions
+
+
+def _compile_step(action):
+    """Turns one action of the preprocessing history into the step, or returns None if it does not change values."""
+    if action["preproc_type"] == PreprocessingTypes.SCALING:
+        if action["scaling_method"] == "Min-Max Scaling":
+            return _ScalingStep(action["min"], action["max"] - action["min"])
+        elif action["scaling_method"] == "Standard Scaling":
+            return _ScalingStep(action["mean"], action["std"])
+        else:
+            raise ValueError(f"Unknown scaling_method: {action['scaling_method']}")
+
+    elif action["preproc_type"] == PreprocessingTypes.LABEL_ENCODING:
+        return _LabelEncodingStep(action["mapping"])
+
+    # Outlier removal only removes rows - the values of the new data are not changed by it
+    return None
+
+
+class PreprocessingPipeline:
+    """
+    The preprocessing history of the session (the actions from the page 3), compiled into the fitted pipeline,
+    that can apply the same preprocessing to the new data (and reverse it for the predictions).
+
+    The actions are kept as they are (dicts, e.g. for saving), and every action is compiled once, when it is appended.
+    The steps are looked up by the column name, and applied to whole arrays at once.
+    The fingerprint identifies the whole sequence of the actions, so that the same preprocessing (e.g. the preset of
+    the beginner mode) can be recognised in different sessions.
+    """
+
+    def __init__(self, actions=()):
+        self.actions = []
+        self._steps = {}  # column -> list of the compiled steps, in the order of the actions
+        self.fingerprint = hashlib.sha256().hexdigest()  # The fingerprint of the empty history
+        for action in actions:
+            self.append(action)
+
+    def append(self, action: dict):
+        self.actions.append(action)
+        # Chained, so that the fingerprint of the longer history does not require hashing all the actions again
+        action_json = json.dumps(action, sort_keys=True, default=str)
+        self.fingerprint = hashlib.sha256(f"{self.fingerprint}:{action_json}".encode()).hexdigest()
+        for single_action in split_batch_action(action):
+            step = _compile_step(single_action)
+            if step is not None:
+                self._steps.setdefault(single_action["column"], []).append(step)
+
+    def copy(self):
+        """Returns the pipeline with the same actions, that can be extended independently of this one."""
+        pipeline = PreprocessingPipeline()
+        pipeline.actions = list(self.actions)
+        pipeline._steps = {column: list(steps) for column, steps in self._steps.items()}
+        pipeline.fingerprint = self.fingerprint
+        return pipeline
+
+    def __iter__(self):
+        return iter(self.actions)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def __getitem__(self, index):
+        return self.actions[index]
+
+    def transform_values(self, column, values) -> np.ndarray:
+        """Applies all the steps of the column (in the order they were done) to the array of natural values."""
+        values = np.asarray(values)
+        for step in self._steps.get(column, []):
+            values = step.transform(values)
+        return values
+
+    def inverse_transform_values(self, column, values) -> np.ndarray:
+        """Reverses all the steps of the column, e.g. turns the predicted (scaled) prices back into euros."""
+        values = np.asarray(values)
+        for step in reversed(self._steps.get(column, [])):
+            values = step.inverse_transform(values)
+        return values
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Returns the copy of the DataFrame with natural values, with all the preprocessing applied to it."""
+        return df.assign(**{
+            column: self.transform_values(column, df[column]) for column in df.columns if column in self._steps
+        })
+
+    def transform_value(self, column, value):
+        return self.transform_values(column, [value])[0] if column in self._steps else value
+
+    def inverse_transform_value(self, column, value):
+        return self.inverse_transform_values(column, [value])[0] if column in self._steps else value
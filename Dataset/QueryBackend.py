@@ -0,0 +1,147 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # The embedded engine is optional - without it the same queries are answered by pandas
+    duckdb = None
+
+# Aggregates, that can be used in group_aggregate(): name -> (DuckDB function, pandas method)
+AGGREGATES = {
+    "median": ("median", "median"),
+    "mean": ("avg", "mean"),
+    "count": ("count", "count"),
+}
+
+_local = threading.local()
+
+
+def is_available():
+    """Whether the queries are pushed down to the embedded analytical engine (DuckDB)."""
+    return duckdb is not None
+
+
+def _cursor():
+    """One DuckDB connection per thread (Streamlit runs every session in its own thread)."""
+    if getattr(_local, "connection", None) is None:
+        _local.connection = duckdb.connect()
+    return _local.connection
+
+
+def _query(df: pd.DataFrame, sql: str, params=None) -> pd.DataFrame:
+    """
+    Runs the SQL query over the DataFrame, which is visible in it as the table "dataset".
+    DuckDB scans the columns of the DataFrame in place (also the memory-mapped ones), so nothing is copied
+    except the result of the query.
+    """
+    connection = _cursor()
+    connection.register("dataset", df)
+    try:
+        return connection.execute(sql, params or []).df()
+    finally:
+        connection.unregister("dataset")
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def quantiles(df: pd.DataFrame, column, qs) -> list:
+    """The same as df[column].quantile(qs) (linear interpolation, missing values are skipped)."""
+    if duckdb is None:
+        return df[column].quantile(qs).tolist()
+
+    result = _query(df, f"SELECT quantile_cont({_quote(column)}, ?::DOUBLE[]) FROM dataset", [list(qs)])
+    values = result.iloc[0, 0]
+    if pd.api.types.is_scalar(values) and pd.isna(values):  # No values in the column - all quantiles are NaN
+        return [np.nan] * len(qs)
+    return list(values)
+
+
+def group_aggregate(df: pd.DataFrame, by, column, func="median") -> pd.Series:
+    """The same as df.groupby(by, observed=True)[column].agg(func), for the functions from AGGREGATES."""
+    sql_func, pandas_func = AGGREGATES[func]
+    if duckdb is None:
+        return df.groupby(by, observed=True)[column].agg(pandas_func)
+
+    result = _query(df, f"SELECT {_quote(by)} AS key, {sql_func}({_quote(column)}) AS value FROM dataset "
+                        f"WHERE {_quote(by)} IS NOT NULL GROUP BY {_quote(by)}")
+    return pd.Series(result["value"].values, index=pd.Index(result["key"].values, name=by), name=column)
+
+
+def group_moments(df: pd.DataFrame, by, column) -> pd.DataFrame:
+    """
+    The count, mean and (sample) variance of the column for every group, in one pass.
+
+    :return: DataFrame with the columns count, mean, var, and the groups as the index.
+    """
+    if duckdb is None:
+        return df.groupby(by, observed=True)[column].agg(["count", "mean", "var"])
+
+    key, value = _quote(by), _quote(column)
+    result = _query(df, f"SELECT {key} AS key, count({value}) AS count, avg({value}) AS mean, "
+                        f"var_samp({value}) AS var FROM dataset WHERE {key} IS NOT NULL GROUP BY {key} ORDER BY {key}")
+    return result.set_index(pd.Index(result["key"].values, name=by))[["count", "mean", "var"]]
+
+
+def correlation_matrix(df: pd.DataFrame, columns) -> pd.DataFrame:
+    """The same as df[columns].corr(): Pearson correlation over the pairwise complete rows."""
+    if duckdb is None:
+        return df[columns].corr()
+
+    pairs = [(a, b) for i, a in enumerate(columns) for b in columns[i + 1:]]
+    if not pairs:
+        return df[columns].corr()
+    result = _query(df, "SELECT " + ", ".join(f"corr({_quote(a)}, {_quote(b)})" for a, b in pairs) + " FROM dataset")
+
+    matrix = pd.DataFrame(np.eye(len(columns)), index=columns, columns=columns)
+    for (a, b), value in zip(pairs, result.iloc[0].values):
+        matrix.loc[a, b] = matrix.loc[b, a] = value
+    return matrix
+
+
+def five_number_summaries(df: pd.DataFrame, by, column) -> pd.DataFrame:
+    """
+    The summaries of the boxplots of the column for every group, calculated for all the groups at once: the quartiles
+    and the whiskers (the furthest values within 1.5 IQR from the box, as matplotlib draws them).
+
+    :return: DataFrame with the columns lower, q1, median, q3, upper, and the groups as the index.
+    """
+    if duckdb is None:
+        values = df[[by, column]].dropna()
+        groups = values.groupby(by, observed=True)[column]
+        summaries = groups.quantile([0.25, 0.5, 0.75]).unstack()
+        summaries.columns = ["q1", "median", "q3"]
+
+        # The fences of the group of every row, to find the whiskers in the second (also grouped) pass
+        group_index = groups.ngroup().to_numpy()
+        iqr = (summaries["q3"] - summaries["q1"]).to_numpy()
+        low_fence = summaries["q1"].to_numpy()[group_index] - 1.5 * iqr[group_index]
+        high_fence = summaries["q3"].to_numpy()[group_index] + 1.5 * iqr[group_index]
+        column_values = values[column].to_numpy(dtype=np.float64)
+        whiskers = pd.DataFrame({
+            "lower": np.where(column_values >= low_fence, column_values, np.nan),
+            "upper": np.where(column_values <= high_fence, column_values, np.nan),
+        }).groupby(group_index).agg({"lower": "min", "upper": "max"})
+        summaries["lower"] = whiskers["lower"].to_numpy()
+        summaries["upper"] = whiskers["upper"].to_numpy()
+        return summaries[["lower", "q1", "median", "q3", "upper"]]
+
+    key, value = _quote(by), _quote(column)
+    result = _query(df, f"""
+        WITH quartiles AS (
+            SELECT {key} AS key, quantile_cont({value}, [0.25, 0.5, 0.75]) AS q FROM dataset
+            WHERE {key} IS NOT NULL AND {value} IS NOT NULL GROUP BY {key}
+        ), fences AS (
+            SELECT key, q[1] AS q1, q[2] AS median, q[3] AS q3,
+                   q[1] - 1.5 * (q[3] - q[1]) AS low_fence, q[3] + 1.5 * (q[3] - q[1]) AS high_fence
+            FROM quartiles
+        )
+        SELECT fences.key, min({value}) FILTER (WHERE {value} >= low_fence) AS lower, q1, median, q3,
+               max({value}) FILTER (WHERE {value} <= high_fence) AS upper
+        FROM dataset JOIN fences ON dataset.{key} = fences.key
+        GROUP BY fences.key, q1, median, q3 ORDER BY fences.key
+    """)
+    return result.set_index(pd.Index(result["key"].values, name=by))[["lower", "q1", "median", "q3", "upper"]]
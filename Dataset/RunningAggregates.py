@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+HISTOGRAM_BINS = 50  # The amount of the fixed bins of the histograms, between the smallest and the largest value
+
+
+def _is_numeric(values):
+    return pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype)
+
+
+class RunningAggregates:
+    """
+    The aggregates of the columns, that can be updated with the new rows in O(new rows), without going through the
+    old ones again (e.g. when the fake data is appended on the page 4):
+    - numerical columns: count, sum and sum of squares (so the mean and std), min and max, and the histogram with the
+      fixed bins (the edges are set by the first rows; the later values outside of them are only counted);
+    - every pair of numerical columns: the co-moments over the rows, where both values are known (so the correlation
+      matrix - the same as DataFrame.corr());
+    - categorical columns: the amount of rows of every category.
+
+    The sums are kept relative to the means of the first rows, so that the variance is not lost in rounding of the
+    large sums. The aggregates of two parts of the data can be merged (see merge()).
+    """
+
+    def __init__(self, numerical_columns, dtypes, categorical_columns, shift, histogram_edges):
+        """
+        Use from_frame() instead - it sets the columns, the shift and the edges of the bins by the data.
+
+        :param dtypes: The dtypes of the numerical columns (min and max are returned in them).
+        :param shift: The values, that are subtracted from the numerical columns before summing (their means).
+        :param histogram_edges: column name -> the edges of its bins.
+        """
+        self.numerical_columns = list(numerical_columns)
+        self.dtypes = list(dtypes)
+        self.categorical_columns = list(categorical_columns)
+        self.shift = np.asarray(shift, dtype=np.float64)
+        self.histogram_edges = histogram_edges
+
+        k = len(self.numerical_columns)
+        # The co-moments: [i, j] is over the rows, where both the column i and j are known. The diagonal of them
+        # gives the count, sum and sum of squares of every column
+        self.pair_counts = np.zeros((k, k))
+        self.pair_sums = np.zeros((k, k))  # [i, j] is the sum of the column i
+        self.pair_squares = np.zeros((k, k))  # [i, j] is the sum of squares of the column i
+        self.pair_products = np.zeros((k, k))  # [i, j] is the sum of products of the columns i and j
+        self.minimums = np.full(k, np.nan)
+        self.maximums = np.full(k, np.nan)
+        self.histograms = {name: np.zeros(len(edges) - 1, dtype=np.int64) for name, edges in histogram_edges.items()}
+        self.out_of_bins = dict.fromkeys(histogram_edges, 0)  # The values outside of the fixed bins
+        self.category_counts = {name: pd.Series(dtype=np.int64) for name in self.categorical_columns}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        """The aggregates of all the columns of the DataFrame."""
+        numerical = [name for name in df.columns if _is_numeric(df[name])]
+        categorical = [name for name in df.columns if name not in numerical]
+        shift = [df[name].mean() if df[name].count() else 0.0 for name in numerical]
+        edges = {}
+        for name in numerical:
+            low, high = df[name].min(), df[name].max()
+            if pd.notna(low):
+                edges[name] = np.histogram_bin_edges([low, high], bins=HISTOGRAM_BINS)
+        aggregates = cls(numerical, [df[name].dtype for name in numerical], categorical, np.nan_to_num(shift), edges)
+        aggregates.update(df)
+        return aggregates
+
+    def update(self, rows: pd.DataFrame):
+        """Adds the new rows to the aggregates. Costs O(rows)."""
+        if len(rows) == 0:
+            return
+
+        values = np.column_stack([rows[name].to_numpy(dtype=np.float64, na_value=np.nan)
+                                  for name in self.numerical_columns]) if self.numerical_columns else None
+        if values is not None:
+            known = ~np.isnan(values)
+            centered = np.where(known, values - self.shift, 0.0)
+            weights = known.astype(np.float64)
+            self.pair_counts += weights.T @ weights
+            self.pair_sums += centered.T @ weights
+            self.pair_squares += (centered ** 2).T @ weights
+            self.pair_products += centered.T @ centered
+            self.minimums = np.fmin(self.minimums, np.where(known, values, np.inf).min(axis=0))
+            self.maximums = np.fmax(self.maximums, np.where(known, values, -np.inf).max(axis=0))
+            self.minimums[np.isinf(self.minimums)] = np.nan
+            self.maximums[np.isinf(self.maximums)] = np.nan
+
+            for i, name in enumerate(self.numerical_columns):
+                if name in self.histogram_edges:
+                    edges = self.histogram_edges[name]
+                    column = values[known[:, i], i]
+                    inside = (column >= edges[0]) & (column <= edges[-1])
+                    self.histograms[name] += np.histogram(column[inside], bins=edges)[0]
+                    self.out_of_bins[name] += int((~inside).sum())
+
+        for name in self.categorical_columns:
+            counts = rows[name].value_counts()
+            counts.index = counts.index.astype(object)  # The categories of the new rows can differ from the old ones
+            self.category_counts[name] = self.category_counts[name].add(counts, fill_value=0).astype(np.int64)
+
+    def merge(self, other: "RunningAggregates"):
+        """Adds the aggregates of the other part of the data (with the same columns, shift and bins)."""
+        if other.numerical_columns != self.numerical_columns or not np.array_equal(other.shift, self.shift):
+            raise ValueError("Only the aggregates of the same columns with the same shift can be merged.")
+        self.pair_counts += other.pair_counts
+        self.pair_sums += other.pair_sums
+        self.pair_squares += other.pair_squares
+        self.pair_products += other.pair_products
+        self.minimums = np.fmin(self.minimums, other.minimums)
+        self.maximums = np.fmax(self.maximums, other.maximums)
+        for name in self.histograms:
+            self.histograms[name] += other.histograms[name]
+            self.out_of_bins[name] += other.out_of_bins[name]
+        for name in self.categorical_columns:
+            self.category_counts[name] = self.category_counts[name].add(other.category_counts[name], fill_value=0) \
+                .astype(np.int64)
+
+    def count(self, column):
+        if column in self.categorical_columns:
+            return int(self.category_counts[column].sum())
+        i = self.numerical_columns.index(column)
+        return int(self.pair_counts[i, i])
+
+    def mean_std(self, column):
+        """The mean and the (sample) standard deviation, as Series.mean() and Series.std() return them."""
+        i = self.numerical_columns.index(column)
+        count, total, squares = self.pair_counts[i, i], self.pair_sums[i, i], self.pair_squares[i, i]
+        if count == 0:
+            return np.nan, np.nan
+        mean = total / count
+        variance = (squares - total * mean) / (count - 1) if count > 1 else np.nan
+        return mean + self.shift[i], np.sqrt(max(variance, 0.0))
+
+    def min_max(self, column):
+        """The smallest and the largest value, in the dtype of the column (as Series.min() and max() return them)."""
+        i = self.numerical_columns.index(column)
+        if np.isnan(self.minimums[i]):
+            return np.nan, np.nan
+        values = pd.Series([self.minimums[i], self.maximums[i]]).astype(self.dtypes[i])
+        return values.iloc[0], values.iloc[1]
+
+    def histogram(self, column):
+        """The counts of the fixed bins and their edges, or None if some values are outside of the bins."""
+        if column not in self.histogram_edges or self.out_of_bins[column]:
+            return None
+        return self.histograms[column].copy(), self.histogram_edges[column]
+
+    def value_counts(self, column, normalize=False) -> pd.Series:
+        """The amount of rows of every category (from the most frequent), as Series.value_counts() returns it."""
+        counts = self.category_counts[column]
+        counts = counts[counts > 0].sort_values(ascending=False, kind="stable")
+        return counts / counts.sum() if normalize else counts
+
+    def correlation_matrix(self, columns) -> pd.DataFrame:
+        """The Pearson correlation over the pairwise complete rows (the same as df[columns].corr())."""
+        index = [self.numerical_columns.index(name) for name in columns]
+        grid = np.ix_(index, index)
+        counts, sums, squares = self.pair_counts[grid], self.pair_sums[grid], self.pair_squares[grid]
+        products = self.pair_products[grid]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariance = counts * products - sums * sums.T
+            scatter = counts * squares - sums ** 2  # [i, j] is n^2 * variance of the column i (over the pair rows)
+            matrix = np.clip(covariance / np.sqrt(scatter * scatter.T), -1, 1)
+        matrix[counts < 2] = np.nan
+        np.fill_diagonal(matrix, np.where(np.diag(counts) >= 2, 1.0, np.nan))
+        return pd.DataFrame(matrix, index=list(columns), columns=list(columns))
@@ -0,0 +1,258 @@
+import numpy as np
+import pandas as pd
+
+
+def _plain_values(values):
+    """Drops the index of the Series (the values are aligned by position), but keeps the dtype (e.g. category)."""
+    return values.array if isinstance(values, pd.Series) else values
+
+
+class SessionDataset:
+    """
+    The version of the dataset that belongs to one user session (the one used on the page 3 and further).
+
+    Instead of keeping its own full copy of the dataset, the session keeps a reference to the shared base dataset
+    (that must never be modified) and only its own edits on top of it:
+    - row mask over the base rows (the rows that were removed by preprocessing actions);
+    - replaced or added columns (label encoding, scaling, ...), calculated for all the base rows;
+    - appended rows (fake data), stored in the same form as the rest of the current dataset.
+
+    The edits are recorded as a lazy plan: the row filters are fused into the single row mask as they come, and the
+    column transformations are only queued - they are applied (all the queued ones of a column in one pass) when the
+    column is needed for the first time. The DataFrame is materialised only when somebody asks for it, and it is
+    kept until the next edit. Resetting the dataset simply drops the edits, so it costs O(1).
+    """
+
+    def __init__(self, base: pd.DataFrame):
+        self.base = base
+        self._last_version = 0  # The counter of the edits, is never reset, so every version number is unique
+        self.reset()
+
+    def _next_version(self):
+        self._last_version += 1
+        return self._last_version
+
+    def version(self, columns=None):
+        """
+        The version of the values of the given columns (all the columns by default). It changes whenever any of the
+        columns is edited, or the rows are removed or appended, so whoever used the columns can tell whether they
+        have to be used again - e.g. whether the chart is outdated.
+        """
+        columns = self.columns if columns is None else columns
+        return max([self._rows_version] + [self._column_versions.get(name, 0) for name in columns])
+
+    def reset(self):
+        """Returns the dataset to the state of the base dataset."""
+        self._rows_version = 0  # The version of the set of rows; 0 is the base dataset
+        self._column_versions = {}  # column name -> the version of its values, for the edited columns only
+        self._row_mask = None  # bool array over the base rows; None means that all the rows are kept
+        self._columns = {}  # column name -> values for ALL the base rows (also for the removed ones)
+        self._pending = {}  # column name -> queued transformations of the base rows, not applied yet
+        self._appended = None  # DataFrame with the appended rows
+        self._frame = None  # Materialised DataFrame, rebuilt lazily after any edit
+
+    def snapshot(self):
+        """
+        Returns the current state of the edits, that can be brought back later with restore().
+        The values are never modified in place (every edit replaces them), so the snapshot only keeps the references
+        to them - it costs O(number of edited columns), and the snapshots share the data with each other.
+        """
+        pending = {name: list(funcs) for name, funcs in self._pending.items()}
+        versions = self._rows_version, dict(self._column_versions)
+        return self._row_mask, dict(self._columns), pending, self._appended, versions
+
+    def restore(self, snapshot, shared=False):
+        """
+        Brings the dataset back to the state, returned by snapshot().
+
+        :param shared: Whether the snapshot was taken from the dataset of another session (with the same base).
+                       Its versions were counted by the other session, so the values, that are not the same as the
+                       current ones, get new versions of this session instead.
+        """
+        row_mask, columns, pending, appended, (rows_version, column_versions) = snapshot
+        if shared:
+            rows_version = self._rows_version if row_mask is self._row_mask else self._next_version()
+            same_columns = {
+                name for name in column_versions
+                if columns.get(name) is self._columns.get(name) and name not in pending and name not in self._pending
+            }
+            column_versions = {
+                name: self._column_versions.get(name, 0) if name in same_columns else self._next_version()
+                for name in column_versions
+            }
+        # The versions identify the values, so the restored values get their old versions back
+        self._rows_version = rows_version
+        self._column_versions = dict(column_versions)
+        self._row_mask = row_mask
+        self._columns = dict(columns)
+        self._pending = {name: list(funcs) for name, funcs in pending.items()}
+        self._appended = appended
+        self._frame = None
+
+    def changes_since(self, snapshot):
+        """
+        The edits, made since the snapshot was taken: the new row mask (if the rows were removed) and the columns,
+        that were replaced or added. They can be applied to the dataset in the same state as the snapshot (e.g. of
+        another session) with apply_changes(). The queued transformations are applied here, and only the references
+        to the values are returned. The appended rows are not included.
+        """
+        row_mask, columns = snapshot[0], snapshot[1]
+        self.apply_pending()
+        changed_columns = {name: values for name, values in self._columns.items() if columns.get(name) is not values}
+        return self._row_mask is not row_mask, self._row_mask, changed_columns
+
+    def apply_changes(self, changes):
+        """
+        Applies the edits, returned by changes_since() (of this or another session with the same base), as one edit.
+        The changed values get new versions of this session.
+        """
+        rows_changed, row_mask, columns = changes
+        if rows_changed:
+            self._row_mask = row_mask
+            self._rows_version = self._next_version()
+        if columns:
+            version = self._next_version()
+            for name, values in columns.items():
+                self._pending.pop(name, None)
+                self._columns[name] = values
+                self._column_versions[name] = version
+        self._frame = None
+
+    def __len__(self):
+        base_len = len(self.base) if self._row_mask is None else int(self._row_mask.sum())
+        return base_len + (0 if self._appended is None else len(self._appended))
+
+    @property
+    def columns(self):
+        new_columns = [c for c in {**self._columns, **self._pending} if c not in self.base.columns]
+        return self.base.columns.append(pd.Index(new_columns))
+
+    def is_modified(self):
+        return self._row_mask is not None or bool(self._columns) or bool(self._pending) or \
+            self._appended is not None
+
+    def has_appended_rows(self):
+        return self._appended is not None
+
+    def apply_pending(self):
+        """Applies all the queued transformations now (e.g. before sharing the snapshot with other sessions)."""
+        for name in list(self._pending):
+            self._base_column(name)
+
+    def _base_column(self, name) -> pd.Series:
+        """Values of the column for all the base rows, with the edits of this session applied."""
+        if name in self._pending:
+            # Apply all the queued transformations of the column at once
+            values = self._columns[name] if name in self._columns else self.base[name]
+            for func in self._pending.pop(name):
+                values = pd.Series(_plain_values(func(values)), index=self.base.index, name=name)
+            self._columns[name] = values
+        return self._columns[name] if name in self._columns else self.base[name]
+
+    def column(self, name) -> pd.Series:
+        """Returns the current values of one column, without materialising the whole DataFrame."""
+        if self._frame is not None:
+            return self._frame[name]
+
+        values = self._base_column(name)
+        if self._row_mask is not None:
+            values = values[self._row_mask]
+        if self._appended is not None:
+            values = pd.concat([values, self._appended[name]], ignore_index=True)
+        return values
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """The current state of the dataset as a DataFrame. It must be treated as read-only."""
+        if self._frame is None:
+            if not self.is_modified():
+                self._frame = self.base  # Nothing to materialise - just share the base dataset
+            else:
+                # Only the columns (and rows) that were really changed are copied here
+                frame = pd.DataFrame({name: self._base_column(name) for name in self.columns}, copy=False)
+                if self._row_mask is not None:
+                    frame = frame[self._row_mask]
+                if self._appended is not None:
+                    frame = pd.concat([frame, self._appended], ignore_index=True)
+                self._frame = frame
+        return self._frame
+
+    def filter_rows(self, keep):
+        """
+        Removes the rows from the dataset.
+
+        :param keep: Boolean array, aligned with the current rows of the dataset: True for the rows to keep.
+        """
+        keep = np.asarray(keep, dtype=bool)
+        if len(keep) != len(self):
+            raise ValueError(f"The row mask has length {len(keep)}, but the dataset has {len(self)} rows.")
+
+        base_len = len(self) - (0 if self._appended is None else len(self._appended))
+        base_keep, appended_keep = keep[:base_len], keep[base_len:]
+
+        # Translate the mask over the current rows into the mask over all the base rows
+        row_mask = np.ones(len(self.base), dtype=bool) if self._row_mask is None else self._row_mask.copy()
+        row_mask[row_mask] = base_keep
+        self._row_mask = row_mask
+
+        if self._appended is not None:
+            self._appended = self._appended[appended_keep].reset_index(drop=True)
+
+        self._rows_version = self._next_version()
+        self._frame = None
+
+    def transform_column(self, name, func, base_values=None):
+        """
+        Replaces (or adds) the column with the result of the vectorized function.
+
+        :param name: The name of the column.
+        :param func: Function Series -> Series (or array) of the same length. It is applied to the values of all the
+                     base rows, so it must work elementwise; and it is applied later (lazily), so it must not depend
+                     on the state of the dataset.
+        :param base_values: Already calculated result of func for all the base rows (e.g. a derived feature from
+                            the dataset cache). In this case func is applied only to the appended rows.
+        """
+        if base_values is None:
+            # The transformation of the base rows is queued until the column is needed
+            self._pending.setdefault(name, []).append(func)
+        else:
+            self._pending.pop(name, None)
+            self._columns[name] = pd.Series(_plain_values(base_values), index=self.base.index, name=name)
+
+        if self._appended is not None:
+            self._appended = self._appended.assign(**{name: _plain_values(func(self._appended[name]))})
+
+        self._column_versions[name] = self._next_version()
+        self._frame = None
+
+    def transform_columns(self, funcs: dict):
+        """
+        Replaces (or adds) several columns at once, as one edit: {name: func}, see transform_column().
+        The appended rows (if any) are transformed in one go.
+        """
+        for name, func in funcs.items():
+            self._pending.setdefault(name, []).append(func)
+
+        if self._appended is not None:
+            self._appended = self._appended.assign(
+                **{name: _plain_values(func(self._appended[name])) for name, func in funcs.items()}
+            )
+
+        version = self._next_version()
+        self._column_versions.update({name: version for name in funcs})
+        self._frame = None
+
+    def append_rows(self, rows: pd.DataFrame):
+        """Appends new rows (e.g. fake data) to the end of the dataset."""
+        rows = rows.reset_index(drop=True)
+        self._appended = rows if self._appended is None else pd.concat([self._appended, rows], ignore_index=True)
+        self._rows_version = self._next_version()
+        self._frame = None
+
+    def overlay_nbytes(self):
+        """The amount of memory used by the edits of this session (without the shared base dataset)."""
+        nbytes = 0 if self._row_mask is None else self._row_mask.nbytes
+        nbytes += sum(values.memory_usage(index=False, deep=True) for values in self._columns.values())
+        if self._appended is not None:
+            nbytes += int(self._appended.memory_usage(index=False, deep=True).sum())
+        return nbytes
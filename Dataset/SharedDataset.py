@@ -0,0 +1,18 @@
+import pandas as pd
+import pyarrow.feather as feather
+
+
+def read_shared_dataset(path) -> pd.DataFrame:
+    """
+    Opens the prepared dataset (uncompressed Arrow IPC file) as a memory map and wraps it into a DataFrame without
+    copying the data.
+
+    The pages of the file are kept in RAM by the OS only once, no matter how many processes (Streamlit servers or
+    worker processes) open it. The columns of the returned DataFrame are read-only views on the file, so any attempt
+    to modify the shared dataset in place raises an error instead of silently changing it for everybody.
+    """
+    table = feather.read_table(path, memory_map=True)
+
+    # split_blocks keeps every column in its own block, so that the columns are not consolidated (copied) together
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
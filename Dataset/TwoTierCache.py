@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# When the files take more than max_disk_bytes, they are pruned down to this share of it, so that the directory is not
+# scanned again at the next put
+DISK_PRUNE_TARGET = 0.9
+
+
+def _key_digest(key):
+    """The stable digest of the key (the same in every process), that is used as the file name."""
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class TwoTierCache:
+    """
+    The cache, shared by all the sessions of the server and by all the server processes on the machine.
+
+    - The memory tier is an LRU of the recently used values of this process.
+    - The disk tier keeps every value in its own file, named by the digest of the key. So the key must describe the
+      content of the value completely (e.g. the fingerprint of the dataset and all the parameters) - then the value
+      can be reused by any process, and it never has to be invalidated.
+
+    The files are written to a temporary file first and then renamed, so the readers never see a half-written value,
+    and several writers of the same key simply replace the file with the same content. When the files take more
+    than max_disk_bytes, the least recently used of them are deleted. The size of the files is scanned once, and then
+    updated by the writes and deletions of this process (the files of the other processes are found by the next scan,
+    when the directory is pruned).
+    The values must be picklable.
+    """
+
+    def __init__(self, directory, max_memory_items=64, max_disk_bytes=1 << 30):
+        self.directory = directory
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # key digest -> value, oldest first
+        self._disk_bytes = None  # The total size of the files, scanned at the first put
+        self._lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}.pkl")
+
+    def get(self, key, default=None):
+        digest = _key_digest(key)
+        with self._lock:
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+                self.memory_hits += 1
+                return self._memory[digest]
+
+        try:
+            with open(self._path(digest), "rb") as f:
+                value = pickle.load(f)
+            os.utime(self._path(digest))  # The time of the last use, for the eviction from the disk
+        except (OSError, EOFError, pickle.UnpicklingError):
+            with self._lock:
+                self.misses += 1
+            return default
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(digest, value)
+        return value
+
+    def put(self, key, value):
+        digest = _key_digest(key)
+        with self._lock:
+            self._remember(digest, value)
+
+        path = self._path(digest)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp_path)
+            replaced_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            tmp_path = None
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            # The disk tier is only an optimisation - the value is still kept in memory
+            logger.warning("The value could not be cached on the disk: %s", e)
+            return
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += size - replaced_size
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._prune_disk()
+
+    def _remember(self, digest, value):
+        self._memory[digest] = value
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _list_files(self):
+        """(time of the last use, size, path) of every value file on the disk."""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".pkl"):
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue  # Deleted by another process at the same time
+                    files.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+        return files
+
+    def _scan_disk_bytes(self):
+        return sum(size for _, size, _ in self._list_files())
+
+    def _prune_disk(self):
+        """Deletes the least recently used files, until all of them fit into DISK_PRUNE_TARGET of max_disk_bytes."""
+        files = self._list_files()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes * DISK_PRUNE_TARGET:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+        with self._lock:
+            self._disk_bytes = total
@@ -1,12 +1,17 @@
 import pandas as pd
 import re
-from typing import Any, Text, Dict, List
+from typing import Any, Text, Dict, List, Tuple
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.types import DomainDict
 from kagglehub import dataset_download
 from difflib import get_close_matches
 
+try:
+    import duckdb
+except ImportError:  # DuckDB is optional - without it the recommendations are calculated by pandas
+    duckdb = None
+
 
 # Load dataset from Kaggle
 path = dataset_download("shaunoilund/auto-sales-ebay-germany-random-50k-cleaned")
@@ -23,6 +28,14 @@ if data is not None:
     data['fuel_type'] = data['fuel_type'].str.lower()
     data['brand'] = data['brand'].str.lower()
 
+# The dataset is loaded into the embedded database once, so that every recommendation is a single query
+connection = None
+if data is not None and duckdb is not None:
+    connection = duckdb.connect()
+    connection.register("autos_df", data)
+    connection.execute("CREATE TABLE autos AS SELECT * FROM autos_df")
+    connection.unregister("autos_df")
+
 # Define unique values for categorical fields
 unique_vehicle_types = ["cabrio", "kleinwagen", "suv", "kombi", "limousine", "coupe", "bus", "andere", "unknown"]
 unique_transmissions = ["manuell", "automatik", "unknown"]
@@ -43,57 +56,87 @@ def extract_text_from_message_with_correction(message: str, valid_values: List[s
             return match[0]
     return None
 
-def filter_data(filters: Dict[Text, Any]) -> pd.DataFrame:
-    if data is None:
-        return pd.DataFrame()
-
-    filtered_data = data.copy()
+def parse_filters(filters: Dict[Text, Any]) -> Tuple[Dict[Text, Tuple], Dict[Text, Text]]:
+    """
+    Turns the slot values into the range filters {column: (lower, upper)} (None means no bound)
+    and the equality filters {column: lowercase value}.
+    """
+    ranges, equals = {}, {}
 
-    # Step 1: Filter by price
-    if filters.get("price_EUR") is not None:
-        try:
-            price = float(filters["price_EUR"])
-            filtered_data = filtered_data[
-                (filtered_data["price_EUR"] >= price * 0.9) & (filtered_data["price_EUR"] <= price * 1.1)
-            ]
-        except ValueError:
-            pass
+    # Price, power and odometer: +-10% around the given value
+    for key in ["price_EUR", "power_ps", "odometer_km"]:
+        if filters.get(key) is not None:
+            try:
+                value = float(filters[key])
+                ranges[key] = (value * 0.9, value * 1.1)
+            except ValueError:
+                pass
 
-    # Step 2: Filter by registration year
+    # Registration year: not older than the given one
     if filters.get("registration_year") is not None:
         try:
-            year = int(filters["registration_year"])
-            filtered_data = filtered_data[filtered_data["registration_year"] >= year]
-        except ValueError:
-            pass
-
-    # Step 3: Filter by power
-    if filters.get("power_ps") is not None:
-        try:
-            power = float(filters["power_ps"])
-            filtered_data = filtered_data[
-                (filtered_data["power_ps"] >= power * 0.9) & (filtered_data["power_ps"] <= power * 1.1)
-            ]
+            ranges["registration_year"] = (int(filters["registration_year"]), None)
         except ValueError:
             pass
 
-    # Step 4: Filter by odometer
-    if filters.get("odometer_km") is not None:
-        try:
-            odometer = float(filters["odometer_km"])
-            filtered_data = filtered_data[
-                (filtered_data["odometer_km"] >= odometer * 0.9) & (filtered_data["odometer_km"] <= odometer * 1.1)
-            ]
-        except ValueError:
-            pass
-
-    # Step 5: Filter by categorical fields
+    # Categorical fields
     for key in ["vehicle_type", "transmission", "fuel_type", "brand"]:
         if filters.get(key) is not None:
-            value = filters[key].lower()
-            filtered_data = filtered_data[filtered_data[key].str.lower() == value]
+            equals[key] = filters[key].lower()
+
+    return ranges, equals
 
-    return filtered_data
+
+def filter_data(filters: Dict[Text, Any]) -> pd.DataFrame:
+    if data is None:
+        return pd.DataFrame()
+
+    ranges, equals = parse_filters(filters)
+    mask = pd.Series(True, index=data.index)
+    for key, (lower, upper) in ranges.items():
+        if lower is not None:
+            mask &= data[key] >= lower
+        if upper is not None:
+            mask &= data[key] <= upper
+    for key, value in equals.items():
+        mask &= data[key] == value
+
+    return data[mask]
+
+
+def find_top_cars(filters: Dict[Text, Any], k: int = 3) -> pd.DataFrame:
+    """
+    The k most popular (brand, model) pairs among the cars matching the filters, with their "popularity".
+    With DuckDB the filtering, grouping and sorting are done by one query, and only k rows come back.
+    """
+    if connection is None:
+        return (
+            filter_data(filters)
+            .groupby(["brand", "model"])
+            .size()
+            .reset_index(name="popularity")
+            .sort_values(by="popularity", ascending=False)
+            .head(k)
+        )
+
+    ranges, equals = parse_filters(filters)
+    conditions, params = ["brand IS NOT NULL", "model IS NOT NULL"], []
+    for key, (lower, upper) in ranges.items():
+        if lower is not None:
+            conditions.append(f"{key} >= ?")
+            params.append(lower)
+        if upper is not None:
+            conditions.append(f"{key} <= ?")
+            params.append(upper)
+    for key, value in equals.items():
+        conditions.append(f"{key} = ?")
+        params.append(value)
+
+    return connection.cursor().execute(
+        f"SELECT brand, model, count(*) AS popularity FROM autos WHERE {' AND '.join(conditions)} "
+        f"GROUP BY brand, model ORDER BY popularity DESC, brand, model LIMIT {int(k)}",
+        params
+    ).df()
 
 from rasa_sdk.events import SlotSet
 
@@ -127,20 +170,11 @@ class ActionProvideRecommendation(Action):
         #     debug_message += f"- {key}: {value}\n"
         # dispatcher.utter_message(text=debug_message)
 
-        filtered_data = filter_data(filters)
+        top_cars = find_top_cars(filters, k=3)
 
-        if filtered_data.empty:
+        if top_cars.empty:
             dispatcher.utter_message(text="Unfortunately, I couldn't find any cars matching your criteria.")
         else:
-            top_cars = (
-                filtered_data
-                .groupby(["brand", "model"])
-                .size()
-                .reset_index(name="popularity")
-                .sort_values(by="popularity", ascending=False)
-                .head(3)
-            )
-
             response = "Here are the top 3 most popular cars based on your criteria:\n"
             for index, row in top_cars.iterrows():
                 response += f"- {row['brand']} {row['model']} (popularity: {row['popularity']})\n"
@@ -1,48 +1,387 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
 import kagglehub
+import numpy as np
 import streamlit as st
 import pandas as pd
 
 # from DashboardManager.DashboardManager import DashboardManager
+from DashboardManager.ChartCache import ChartCache, ChartCacheBudget
+from DashboardManager.ChartRenderer import draw_chart_in_worker
+from DashboardManager.RenderPool import create_render_pool
 from DashboardManager.DashboardManagerEnums import PreprocessingTypes, DashboardItemTypes
+from Dataset.DatasetSchema import IRRELEVANT_COLUMNS, CATEGORICAL_COLUMNS, NON_NUMERICAL_COLUMNS, NUMERICAL_COLUMNS, \
+    apply_schema
+from Dataset.DatasetStatistics import DatasetStatistics
+from Dataset.DatasetStore import DatasetStore, ingest_csv
+from Dataset.FeatureDerivation import DERIVED_FEATURES, derive_features
+from Dataset.PreprocessingCheckpoints import PreprocessingCheckpoints
+from Dataset.PreprocessingPipeline import PreprocessingPipeline
+from Dataset.SessionDataset import SessionDataset
+from Dataset.SharedDataset import read_shared_dataset
+from Dataset.TwoTierCache import TwoTierCache
 
 # The names of session variables that needed to be initialized
 COMMON_SESSION_VARIABLES_NAMES = [
-    'df', 'df_mappings', 'df_quantitative', 'hardcore_mode', 'chart_hashes',  # common variables
+    'df', 'dataset', 'df_mappings', 'df_quantitative', 'hardcore_mode', 'chart_hashes',  # common variables
+    'dataset_statistics', 'derived_features',
     'categorical_columns', 'numerical_columns'  # dynamic lists of columns of different types
 ]
 
 KAGGLE_DATASET_PATH = "shaunoilund/auto-sales-ebay-germany-random-50k-cleaned"
-IRRELEVANT_COLUMNS = ['ab_test', 'date_crawled', 'last_seen', 'ad_created', 'car_name', 'registration_month',
-                      'Unnamed: 0']
-CATEGORICAL_COLUMNS = ['vehicle_type', 'transmission', 'model', 'fuel_type', 'brand', 'unrepaired_damage']
-NON_NUMERICAL_COLUMNS = CATEGORICAL_COLUMNS + ['postal_code']
+KAGGLE_DATASET_FILE = "autos_random_50k_cleaned.csv"
+
+# The prepared dataset is stored on disk in Arrow IPC (Feather) format, so that restarted server can start serving
+# without the Kaggle client and without parsing the CSV again.
+DATASET_CACHE_DIR = "dataset_cache"
+DATASET_CACHE_MANIFEST = os.path.join(DATASET_CACHE_DIR, "manifest.json")
+
+# Increase it whenever the way of preparing the dataset is changed, so that old cache files are not used anymore
+DATASET_CACHE_VERSION = 3
+
+# Path to a large CSV (e.g. the full eBay dump or our own listing exports) to be used instead of the Kaggle dataset.
+# Such a file is never read into memory at once: it is ingested chunk by chunk into the partitioned columnar store,
+# and the pages work with a random sample of at most MAX_IN_MEMORY_ROWS rows of it.
+DATASET_SOURCE_ENV = "CARLAB_DATASET_SOURCE"
+MAX_IN_MEMORY_ROWS = 1_000_000
+
+# The memory for the rendered chart images: per session, and for all the sessions of the server together
+CHART_CACHE_SESSION_BYTES = 64 * 2 ** 20
+CHART_CACHE_GLOBAL_BYTES = 512 * 2 ** 20
+
+# The amount of worker processes, that render the charts in parallel (shared by all the sessions)
+CHART_RENDER_WORKERS = min(4, os.cpu_count() or 1)
+
+# The caches of the results, that can be reused by all the sessions and server processes (see get_shared_cache()).
+# The values are kept on the disk, and the most recently used of them also in memory of every process
+SHARED_CACHE_DIR = os.path.join(DATASET_CACHE_DIR, "shared")
+SHARED_CACHE_MEMORY_ITEMS = 32
+SHARED_CACHE_DISK_BYTES = 1 << 30
+
+# The amount of preprocessing results, that are kept in memory for reusing (see execute_preprocessing_action)
+PREPROCESSING_RESULTS_CACHE_SIZE = 64
+
+# The amount of summary statistics (quantiles, medians, ...), kept per dataset (see get_dataset_statistics())
+DATASET_STATISTICS_CACHE_SIZE = 256
+
+
+def _fingerprint_file(path, chunk_size=1 << 20):
+    """Calculates the fingerprint of the file content without reading the whole file into memory."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _quick_fingerprint_file(path, chunk_size=1 << 20):
+    """
+    Fingerprint of a large file, that does not require reading all of it: its size, modification time,
+    and the content of its first and last chunks.
+    """
+    sha = hashlib.sha256()
+    stat = os.stat(path)
+    sha.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    with open(path, "rb") as f:
+        sha.update(f.read(chunk_size))
+        f.seek(max(stat.st_size - chunk_size, 0))
+        sha.update(f.read(chunk_size))
+    return sha.hexdigest()
+
+
+def get_dataset_source():
+    """Returns the path of the external dataset file, or None if the Kaggle dataset is used."""
+    return os.environ.get(DATASET_SOURCE_ENV) or None
+
+
+def _dataset_store_path(fingerprint):
+    return os.path.join(DATASET_CACHE_DIR, f"store_{fingerprint[:16]}_v{DATASET_CACHE_VERSION}")
+
+
+def _dataset_cache_path(fingerprint):
+    return os.path.join(DATASET_CACHE_DIR, f"autos_{fingerprint[:16]}_v{DATASET_CACHE_VERSION}.arrow")
+
+
+def _derived_features_cache_path(fingerprint):
+    return os.path.join(DATASET_CACHE_DIR, f"autos_{fingerprint[:16]}_v{DATASET_CACHE_VERSION}_features.arrow")
+
+
+def _write_arrow_file(df, path):
+    """Uncompressed Arrow file is the fastest to load, and can be memory-mapped. It is replaced atomically."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def _read_dataset_cache_manifest():
+    """Returns the manifest of the local dataset cache, or None if there is no usable cache."""
+    try:
+        with open(DATASET_CACHE_MANIFEST, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("version") != DATASET_CACHE_VERSION or not os.path.exists(manifest.get("file", "")):
+        return None
+    # The cache of the Kaggle dataset is not used for the external dataset, and vice versa
+    if manifest.get("source") != get_dataset_source():
+        return None
+    return manifest
+
+
+def _write_dataset_cache(df, fingerprint):
+    """
+    Saves the prepared dataset together with its derived features (see Dataset/FeatureDerivation.py).
+    The files are replaced atomically, so the readers never see a half-written one.
+    """
+    os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+    _write_arrow_file(derive_features(df), _derived_features_cache_path(fingerprint))
+    _write_arrow_file(df, _dataset_cache_path(fingerprint))
+
+
+def _write_dataset_cache_manifest(fingerprint):
+    """Points the manifest to the cache file of the given dataset, so that it is used on the next start."""
+    cache_path = _dataset_cache_path(fingerprint)
+    tmp_path = f"{DATASET_CACHE_MANIFEST}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": DATASET_CACHE_VERSION, "fingerprint": fingerprint, "file": cache_path,
+                   "source": get_dataset_source()}, f)
+    os.replace(tmp_path, DATASET_CACHE_MANIFEST)
+
+
+def _prepare_dataset(csv_path):
+    """Reads the raw CSV and brings it to the form, which is used in the whole application."""
+    df = pd.read_csv(csv_path)
+
+    # Drop irrelevant columns
+    df = df.drop(columns=IRRELEVANT_COLUMNS)
+
+    # Categorical columns become "category", numerical ones are downcast (see Dataset/DatasetSchema.py)
+    df = apply_schema(df)
+
+    return df
+
+
+# The path of the memory-mapped dataset file (e.g. for the worker processes), or None if there is none.
+# It does not change while the server runs, so the manifest is read only once
+@st.cache_resource
+def get_dataset_file():
+    download_dataset()  # Makes sure that the dataset cache is created
+
+    manifest = _read_dataset_cache_manifest()
+    return None if manifest is None else manifest["file"]
+
+
+# Opens the partitioned columnar store of the external dataset (see DATASET_SOURCE_ENV), ingesting the file into it
+# first if needed. Returns None if the Kaggle dataset is used. The store can be queried without loading it into memory.
+@st.cache_resource
+def get_dataset_store():
+    source = get_dataset_source()
+    if source is None:
+        return None
 
-# All the columns minus non-numerical
-NUMERICAL_COLUMNS = ["price_EUR", "registration_year", "power_ps", "odometer_km"]
+    store_path = _dataset_store_path(_quick_fingerprint_file(source))
+    if not os.path.exists(store_path):
+        print(f"dataset ingesting from {source}")
+        os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+        ingest_csv(source, store_path)
+    return DatasetStore(store_path)
 
 
-# Downloads dataset from Kaggle
-@st.cache_data
+def show_sampled_dataset_notice():
+    """
+    Tells the user, that the page works with the random sample of the external dataset (see DATASET_SOURCE_ENV),
+    and not with all of its rows. Shows nothing for the Kaggle dataset, which is used as a whole.
+    """
+    store = get_dataset_store()
+    if store is not None:
+        st.info(f"This page works with the random sample of ``{len(download_dataset()):,}`` of "
+                f"``{store.count_rows():,}`` rows of the dataset - all the charts, statistics and models describe "
+                f"only these rows.")
+
+
+# Loads the dataset from the local cache, or downloads it from Kaggle if there is no cache yet.
+# The returned DataFrame is the same object for all the sessions, and its columns are read-only views on the
+# memory-mapped cache file (shared by all the processes) - the sessions make their edits through SessionDataset.
+@st.cache_resource
 def download_dataset():
+    # If the dataset was already prepared once, the network is not touched at all
+    manifest = _read_dataset_cache_manifest()
+    if manifest is not None:
+        print("dataset loading from the local cache")
+        return read_shared_dataset(manifest["file"])
+
+    # The external dataset can be larger than the memory, so only its sample is kept in the cache file
+    store = get_dataset_store()
+    if store is not None:
+        fingerprint = _quick_fingerprint_file(get_dataset_source())
+        df = store.sample(MAX_IN_MEMORY_ROWS)
+        try:
+            if not os.path.exists(_dataset_cache_path(fingerprint)):
+                _write_dataset_cache(df, fingerprint)
+            _write_dataset_cache_manifest(fingerprint)
+        except OSError as e:
+            print(f"Could not save the dataset cache: {e}")
+            return df
+        return read_shared_dataset(_dataset_cache_path(fingerprint))
+
     # Download the dataset
     print("dataset downloading")
     path = kagglehub.dataset_download(KAGGLE_DATASET_PATH)
-    df = pd.read_csv(f"{path}/autos_random_50k_cleaned.csv")
+    csv_path = f"{path}/{KAGGLE_DATASET_FILE}"
 
-    # Drop irrelevant columns
-    df = df.drop(columns=IRRELEVANT_COLUMNS)
+    # The cache is keyed by the content of the CSV, so the new version of the dataset gets its own cache file
+    fingerprint = _fingerprint_file(csv_path)
+    try:
+        if not os.path.exists(_dataset_cache_path(fingerprint)):
+            _write_dataset_cache(_prepare_dataset(csv_path), fingerprint)
+        _write_dataset_cache_manifest(fingerprint)
+    except OSError as e:
+        # The app is still fully functional without the cache, but the next start will be slower,
+        # and every process will keep its own copy of the dataset
+        print(f"Could not save the dataset cache: {e}")
+        return _prepare_dataset(csv_path)
 
-    return df
+    return read_shared_dataset(_dataset_cache_path(fingerprint))
+
+
+# Loads the features, derived from the dataset (see Dataset/FeatureDerivation.py), aligned with its rows.
+# They are calculated once, together with the dataset cache, and are shared by all the sessions (read-only).
+@st.cache_resource
+def load_derived_features():
+    df = download_dataset()
+    manifest = _read_dataset_cache_manifest()
+    if manifest is None:
+        return derive_features(df)
+
+    # The dataset cache could be created before the features were derived - add them to it
+    features_path = _derived_features_cache_path(manifest["fingerprint"])
+    if not os.path.exists(features_path):
+        try:
+            _write_arrow_file(derive_features(df), features_path)
+        except OSError as e:
+            print(f"Could not save the derived features: {e}")
+            return derive_features(df)
+    return read_shared_dataset(features_path)
+
+
+# The memory limit for the chart images of all the sessions together
+@st.cache_resource
+def get_chart_cache_budget():
+    return ChartCacheBudget(CHART_CACHE_GLOBAL_BYTES)
+
+
+# The worker processes for rendering the charts (see ChartItem.submit_chart()); every worker has its own pyplot state.
+# They are forked by the fork server, and not from the server itself (see DashboardManager/RenderPool.py)
+@st.cache_resource
+def get_chart_render_pool():
+    return create_render_pool(CHART_RENDER_WORKERS)
+
+
+_render_pool_lock = threading.Lock()
+
+
+def _replace_broken_chart_render_pool(pool):
+    """Shuts down the pool, one of whose workers has died, so that get_chart_render_pool() creates the new one."""
+    with _render_pool_lock:
+        if get_chart_render_pool() is pool:  # Another session could replace it already
+            pool.shutdown(wait=False, cancel_futures=True)
+            get_chart_render_pool.clear()
+
+
+def submit_chart_render(spec, data):
+    """
+    Starts rendering the chart in the worker process (see ChartRenderer.draw_chart_in_worker()).
+    If the pool is broken (one of its workers has died), it is replaced by the new one.
+
+    :return: The Future of (image, width).
+    """
+    pool = get_chart_render_pool()
+    try:
+        return pool.submit(draw_chart_in_worker, spec, data)
+    except BrokenProcessPool:
+        _replace_broken_chart_render_pool(pool)
+        return get_chart_render_pool().submit(draw_chart_in_worker, spec, data)
+
+
+# The fingerprint of the shared base dataset (None if the dataset cache could not be created)
+@st.cache_resource
+def get_dataset_fingerprint():
+    download_dataset()  # Makes sure that the dataset cache is created
+
+    manifest = _read_dataset_cache_manifest()
+    return None if manifest is None else manifest["fingerprint"]
+
+
+# The caches, shared by all the sessions and all the server processes: name -> TwoTierCache
+# (see Dataset/TwoTierCache.py). The values are identified by their content, so the cache is never invalidated,
+# except by the version of the way the dataset is prepared
+@st.cache_resource
+def get_shared_cache(name, max_memory_items=SHARED_CACHE_MEMORY_ITEMS):
+    directory = os.path.join(SHARED_CACHE_DIR, f"{name}_v{DATASET_CACHE_VERSION}")
+    return TwoTierCache(directory, max_memory_items=max_memory_items, max_disk_bytes=SHARED_CACHE_DISK_BYTES)
+
+
+# The statistics of the shared base dataset, that are calculated once for all the sessions
+@st.cache_resource
+def _get_base_dataset_statistics():
+    return DatasetStatistics(download_dataset(), DATASET_STATISTICS_CACHE_SIZE)
+
+
+def get_dataset_statistics(source):
+    """
+    The cache of the summary statistics of the dataset (see Dataset/DatasetStatistics.py): the shared one for the
+    base dataset, and the one of this session for its SessionDataset.
+    """
+    if source is download_dataset():
+        return _get_base_dataset_statistics()
+    if source is st.session_state.get("dataset"):
+        return st.session_state.dataset_statistics
+    return DatasetStatistics(source, DATASET_STATISTICS_CACHE_SIZE)  # Some other data - nothing to share it with
+
+
+def get_data_content_key(source):
+    """
+    Identifies the content of the data for the shared caches: the fingerprint of the base dataset, and for the
+    session dataset also the fingerprint of the preprocessing history, that led to its state.
+    None if the content can not be identified - e.g. the appended (fake) rows belong only to this session, and they
+    are not described by the history.
+    """
+    dataset_fingerprint = get_dataset_fingerprint()
+    if dataset_fingerprint is None:
+        return None
+    if source is download_dataset():
+        return dataset_fingerprint
+    if source is st.session_state.get("dataset") and not source.has_appended_rows():
+        return dataset_fingerprint, st.session_state.preprocessing_history.fingerprint
+    return None
+
+
+def _preprocessing_result_key(action_type, dataset, params):
+    """
+    The key of the result of the action in the shared cache: the state of the dataset before the action (see
+    get_data_content_key()) and the action itself. None if the result can not be shared.
+    """
+    content_key = get_data_content_key(dataset)
+    if content_key is None:
+        return None
+    action = json.dumps({"preproc_type": action_type, **params}, sort_keys=True, default=str)
+    return content_key, action
 
 
 # Makes the postal code column kinda categorical - the 1st digit represents the region in Germany
-# Updates the initial df, no return or variable assignment required
+# Updates the session dataset, no return or variable assignment required
 def update_postal_codes():
     # From postal codes, drop everything except the region
     # If the postal code is not German, using category "other" instead
     print("Updating postal codes")
-    st.session_state.df['postal_code'] = st.session_state.df['postal_code'].astype(str).apply(
-        lambda x: int(x[0]) if len(x) == 5 else 10)
+    source, func = DERIVED_FEATURES["postal_region"]
+    st.session_state.dataset.transform_column(source, func, base_values=load_derived_features()["postal_region"])
 
 
 # Function to map categorical columns to numerical values
@@ -64,10 +403,17 @@ def initialize_global_session_variables_if_not_yet():
     if any(map(lambda x: x not in st.session_state, COMMON_SESSION_VARIABLES_NAMES)):
         # print(list(filter(lambda x: x not in st.session_state, COMMON_SESSION_VARIABLES_NAMES)))
         # print("Initializing the session variables")
+        # The initial dataset is shared by all the sessions (read-only)
         st.session_state.df = download_dataset()
+        # The postal region, the vehicle age and the bands of power and mileage of its rows (read-only, shared)
+        st.session_state.derived_features = load_derived_features()
 
-        # The second is for page 3 and later - can be edited in preprocessing function
-        st.session_state.df2 = download_dataset()
+        # The second is for page 3 and later - can be edited in preprocessing function.
+        # It stores only the edits of this session on top of the shared dataset
+        st.session_state.dataset = SessionDataset(st.session_state.df)
+        # Its statistics are kept per version of the columns, so they stay valid through the edits and undo
+        st.session_state.dataset_statistics = DatasetStatistics(st.session_state.dataset,
+                                                                DATASET_STATISTICS_CACHE_SIZE)
 
         # The Dataframe for Fake Data
         st.session_state.fake_df = pd.DataFrame()
@@ -78,14 +424,20 @@ def initialize_global_session_variables_if_not_yet():
         st.session_state.df_mappings = {}
 
         st.session_state.hardcore_mode = False
-        st.session_state.chart_hashes = {}
+        # The cache of the rendered charts, limited by memory (see DashboardManager/ChartCache.py)
+        st.session_state.chart_hashes = ChartCache(CHART_CACHE_SESSION_BYTES, get_chart_cache_budget())
 
         # dynamic lists of columns of different types(if we delete or add new columns)
         st.session_state.categorical_columns = CATEGORICAL_COLUMNS.copy()
         st.session_state.numerical_columns = NUMERICAL_COLUMNS.copy()
 
-        # preprocessing history for being able to do the same preprocessing on the 6th page (counting from 0)
-        st.session_state.preprocessing_history = []
+        # preprocessing history for being able to do the same preprocessing on the 6th page (counting from 0).
+        # It is compiled into the pipeline, that can be applied to the new data (see Dataset/PreprocessingPipeline.py)
+        st.session_state.preprocessing_history = PreprocessingPipeline()
+
+        # The states after every preprocessing action, for undo/redo on the page 3
+        st.session_state.preprocessing_checkpoints = PreprocessingCheckpoints(st.session_state.dataset,
+                                                                              st.session_state.preprocessing_history)
 
         st.session_state.page_2_was_ever_rendered = False
         st.session_state.page_3_was_ever_rendered = False
@@ -95,32 +447,33 @@ def initialize_global_session_variables_if_not_yet():
         print("The App is running.")
         print("-------------------------------------")
 
+    # The placeholders of the charts, that are rendered in the worker processes, belong to one run of the page.
+    # If the previous run was interrupted (e.g. by st.rerun()), its charts are not shown anymore (but still rendered)
+    st.session_state.pending_charts = []
 
-def execute_preprocessing_action(action_type, manager, df, column=None, method=None, mapping=None, threshold=None,
-                                 scaling_method=None):
-    """
-    Executes a preprocessing action based on the given parameters.
 
-    :param action_type: Type of preprocessing action to perform (e.g., OUTLIER_REMOVAL, LABEL_ENCODING, SCALING).
-    :param column: Column on which the action is performed.
-    :param method: Method for preprocessing (e.g., 'top', 'bottom', 'both').
-    :param threshold: Threshold value for preprocessing.
-    :param scaling_method: Scaling method (e.g., 'Min-Max Scaling', 'Standard Scaling').
+def _apply_preprocessing_action(action_type, dataset, column=None, method=None, mapping=None, threshold=None,
+                                scaling_method=None, columns=None):
     """
+    Performs the preprocessing action on the dataset (see execute_preprocessing_action() for the parameters).
 
+    :return: The preprocessing type, the action (for the PreprocessingItem) and the entry of the preprocessing history.
+    """
     if action_type == PreprocessingTypes.OUTLIER_REMOVAL:
         if not column or not method or threshold is None:
             raise ValueError("Missing parameters for OUTLIER_REMOVAL.")
 
         def remove_outliers(column, method, threshold):
+            values = dataset.column(column)
+            # The quantiles are cached per version of the column (see get_dataset_statistics())
+            lower_bound, upper_bound = get_dataset_statistics(dataset).quantiles(
+                column, [threshold / 100, 1 - threshold / 100])
             if method == 'top':
-                df.drop(df[df[column] > df[column].quantile(1 - threshold / 100)].index, inplace=True)
+                dataset.filter_rows(~(values > upper_bound))
             elif method == 'bottom':
-                df.drop(df[df[column] < df[column].quantile(threshold / 100)].index, inplace=True)
+                dataset.filter_rows(~(values < lower_bound))
             elif method == 'both':
-                lower_bound = df[column].quantile(threshold / 100)
-                upper_bound = df[column].quantile(1 - threshold / 100)
-                df.drop(df[(df[column] < lower_bound) | (df[column] > upper_bound)].index, inplace=True)
+                dataset.filter_rows(~((values < lower_bound) | (values > upper_bound)))
             else:
                 raise ValueError("Unknown method for outlier removal.")
 
@@ -131,168 +484,189 @@ def execute_preprocessing_action(action_type, manager, df, column=None, method=N
             "method": method,
             "threshold": threshold
         }
-        manager.create_item(
-            item_pos=len(manager.items),
-            item_type=DashboardItemTypes.PREPROCESSING_BOX,
-            action=action,
-            preproc_type=PreprocessingTypes.OUTLIER_REMOVAL
-        )
-
-        st.session_state.preprocessing_history.append(
-            {
-                "preproc_type": action_type,
-                "column": column,
-                "method": method,
-                "threshold": threshold
-            }
-        )
+        preproc_type = PreprocessingTypes.OUTLIER_REMOVAL
+
+        history_entry = {
+            "preproc_type": action_type,
+            "column": column,
+            "method": method,
+            "threshold": threshold
+        }
 
     elif action_type == PreprocessingTypes.LABEL_ENCODING:
-        if not column:
+        # Several columns can be encoded at once (columns=[...]) - then the mapping is given and saved per column
+        encoded_columns = columns if columns is not None else [column]
+        if not encoded_columns or not all(encoded_columns):
             raise ValueError("Missing column for LABEL_ENCODING.")
+        given_mappings = (mapping if columns is not None else {column: mapping}) or {}
+
+        encoded_mappings, encoders = {}, {}
+        for name in encoded_columns:
+            categories = dataset.column(name).astype('category').dtype
+            given_mapping = given_mappings.get(name)
+            encoded_mappings[name] = given_mapping if given_mapping is not None else \
+                dict(enumerate(categories.categories))
+            encoders[name] = lambda values, categories=categories: values.astype(categories).cat.codes
+        dataset.transform_columns(encoders)
 
-        encoded_mapping = mapping if mapping is not None \
-            else dict(enumerate(df[column].astype('category').cat.categories))
-        st.session_state.df2[column] = st.session_state.df2[column].astype('category').cat.codes
+        target = {"columns": encoded_columns} if columns is not None else {"column": column}
+        encoded_mapping = encoded_mappings if columns is not None else encoded_mappings[column]
 
         action = {
-            "column": column,
+            **target,
             "action": "label_encoding",
             "mapping": encoded_mapping
         }
-        manager.create_item(
-            item_pos=len(manager.items),
-            item_type=DashboardItemTypes.PREPROCESSING_BOX,
-            action=action,
-            preproc_type=PreprocessingTypes.LABEL_ENCODING
-        )
-
-        st.session_state.preprocessing_history.append(
-            {
-                "preproc_type": action_type,
-                "column": column,
-                "method": method,
-                "mapping": encoded_mapping
-            }
-        )
+        preproc_type = PreprocessingTypes.LABEL_ENCODING
+
+        history_entry = {
+            "preproc_type": action_type,
+            **target,
+            "method": method,
+            "mapping": encoded_mapping
+        }
 
     elif action_type == PreprocessingTypes.SCALING:
-        if not column or not scaling_method:
+        # Several columns can be scaled at once (columns=[...]) - then the parameters are saved per column
+        scaled_columns = columns if columns is not None else [column]
+        if not scaled_columns or not all(scaled_columns) or not scaling_method:
             raise ValueError("Missing parameters for SCALING.")
 
-        mini, maxi = df[column].min(), df[column].max()
-
-        if scaling_method == "Min-Max Scaling":
-            df[column] = ((df[column] - df[column].min()) /
-                          (df[column].max() - df[column].min()))
-
-            st.session_state.preprocessing_history.append(
-                {
-                    "preproc_type": action_type,
-                    "column": column,
-                    "method": method,
-                    "scaling_method": scaling_method,
-                    "min": mini,
-                    "max": maxi
-                }
-            )
-
-        elif scaling_method == "Standard Scaling":
-            meani, stdi = df[column].mean(), df[column].std()
-
-            df[column] = (df[column] - df[column].mean()) / df[column].std()
-
-            st.session_state.preprocessing_history.append(
-                {
-                    "preproc_type": action_type,
-                    "column": column,
-                    "method": method,
-                    "scaling_method": scaling_method,
-                    "mean": meani,
-                    "std": stdi
-                }
-            )
-
-        else:
-            raise ValueError(f"Unknown scaling_method: {scaling_method}")
+        statistics = get_dataset_statistics(dataset)
+        scaling_params, scalers = {}, {}
+        for name in scaled_columns:
+            if scaling_method == "Min-Max Scaling":
+                mini, maxi = statistics.min_max(name)
+                scaling_params[name] = {"min": mini, "max": maxi}
+                scalers[name] = lambda values, mini=mini, maxi=maxi: (values.astype(np.float64) - mini) / (maxi - mini)
+
+            elif scaling_method == "Standard Scaling":
+                meani, stdi = statistics.mean_std(name)
+                scaling_params[name] = {"mean": meani, "std": stdi}
+                scalers[name] = lambda values, meani=meani, stdi=stdi: (values.astype(np.float64) - meani) / stdi
+
+            else:
+                raise ValueError(f"Unknown scaling_method: {scaling_method}")
+
+        dataset.transform_columns(scalers)
+
+        target = {"columns": scaled_columns} if columns is not None else {"column": column}
+        # E.g. {"min": 0, "max": 100} for one column, or {"min": {"price_EUR": 0, ...}, "max": {...}} for several
+        saved_params = {
+            param: {name: scaling_params[name][param] for name in scaled_columns} if columns is not None
+            else scaling_params[column][param]
+            for param in scaling_params[scaled_columns[0]]
+        }
+
+        history_entry = {
+            "preproc_type": action_type,
+            **target,
+            "method": method,
+            "scaling_method": scaling_method,
+            **saved_params
+        }
 
         action = {
-            "column": column,
+            **target,
             "action": "scaling",
             "scaling_method": scaling_method
         }
-        manager.create_item(
-            item_pos=len(manager.items),
-            item_type=DashboardItemTypes.PREPROCESSING_BOX,
-            action=action,
-            preproc_type=PreprocessingTypes.SCALING
-        )
-
+        preproc_type = PreprocessingTypes.SCALING
 
     else:
         raise ValueError(f"Unknown action_type: {action_type}")
 
+    return preproc_type, action, history_entry
 
-def do_preprocessing(param_name: str, param_value):
-    for action in st.session_state.preprocessing_history:
-
-        # If the action was executed on target parameter:
-        if param_name == action["column"]:
-
-            # If it was scaling:
-            if action["preproc_type"] == PreprocessingTypes.SCALING:
-                if action["scaling_method"] == "Min-Max Scaling":
-                    mini, maxi = action["min"], action["max"]
-                    return (param_value - mini) / (maxi - mini)
-                elif action["scaling_method"] == "Standard Scaling":
-                    mean, std = action["mean"], action["std"]
-                    return (param_value - mean) / std
-                else:
-                    raise ValueError(f"Unknown scaling_method: {action['scaling_method']}")
-
-            # Elif it was label encoding
-            elif action["preproc_type"] == PreprocessingTypes.LABEL_ENCODING:
-                # Then just look for the needed key
-                mapping = action["mapping"]
-                # st.write(mapping)
-                for key, value in mapping.items():
-                    if value == param_value:
-                        return int(key)
-            else:
-                pass
 
-    return param_value  # do nothing
+def execute_preprocessing_action(action_type, manager, dataset, column=None, method=None, mapping=None,
+                                 threshold=None, scaling_method=None, columns=None):
+    """
+    Executes a preprocessing action based on the given parameters.
+
+    :param action_type: Type of preprocessing action to perform (e.g., OUTLIER_REMOVAL, LABEL_ENCODING, SCALING).
+    :param dataset: SessionDataset, on which the action is performed.
+    :param column: Column on which the action is performed.
+    :param columns: Several columns, on which the action is performed at once (for LABEL_ENCODING and SCALING)
+                    instead of one column. It is recorded as a single action, with mapping/parameters per column.
+    :param method: Method for preprocessing (e.g., 'top', 'bottom', 'both').
+    :param mapping: Label encoding mapping {code: value} to be saved (or {column: mapping} for several columns).
+    :param threshold: Threshold value for preprocessing.
+    :param scaling_method: Scaling method (e.g., 'Min-Max Scaling', 'Standard Scaling').
+    :return: PreprocessingItem, that was created for this action in the manager.
+    """
+    params = dict(column=column, method=method, mapping=mapping, threshold=threshold,
+                  scaling_method=scaling_method, columns=columns)
+
+    # If another session has already executed the same actions on the same dataset, its result is reused
+    cache_key = _preprocessing_result_key(action_type, dataset, params)
+    results_cache = get_shared_cache("preprocessing_changes", PREPROCESSING_RESULTS_CACHE_SIZE)
+    cached_result = None if cache_key is None else results_cache.get(cache_key)
+    if cached_result is not None:
+        # The dataset is in the same state, as the one the result was calculated from - only the changes are applied
+        dataset_changes, preproc_type, action, history_entry = cached_result
+        dataset.apply_changes(dataset_changes)
+    else:
+        if cache_key is not None:
+            # So that only the columns, changed by this action, are shared (see SessionDataset.changes_since())
+            dataset.apply_pending()
+            parent_snapshot = dataset.snapshot()
+        preproc_type, action, history_entry = _apply_preprocessing_action(action_type, dataset, **params)
+        if cache_key is not None:
+            results_cache.put(cache_key,
+                              (dataset.changes_since(parent_snapshot), preproc_type, action, history_entry))
+
+    # The action and the history entry can be shared with other sessions, so every session gets its own copy
+    item = manager.create_item(
+        item_pos=len(manager.items),
+        item_type=DashboardItemTypes.PREPROCESSING_BOX,
+        action=copy.deepcopy(action),
+        preproc_type=preproc_type
+    )
+    st.session_state.preprocessing_history.append(copy.deepcopy(history_entry))
+
+    # Remember the state after this action, so that the user can come back to it later
+    st.session_state.preprocessing_checkpoints.record(dataset, st.session_state.preprocessing_history, item)
+    return item
+
+
+def checkout_preprocessing_step(step, manager):
+    """
+    Brings the session dataset and the preprocessing history back to the state after the given preprocessing step
+    (0 is the initial dataset). See Dataset/PreprocessingCheckpoints.py.
+
+    :param manager: DashboardManager with the preprocessing history (on the page 3).
+    """
+    st.session_state.preprocessing_history = st.session_state.preprocessing_checkpoints.checkout(
+        step, st.session_state.dataset, manager
+    )
+    # The fake rows, appended after the step, are not in the dataset anymore
+    st.session_state.fake_df = st.session_state.preprocessing_checkpoints.fake_rows
 
 
-def reverse_preprocessing(param_name: str, param_value):
-    for action in st.session_state.preprocessing_history:
-
-        # If the action was executed on target parameter:
-        if param_name == action["column"]:
-
-            # If it was scaling:
-            if action["preproc_type"] == PreprocessingTypes.SCALING:
-                # print("SCALIIIIING!")
-                if action["scaling_method"] == "Min-Max Scaling":
-                    mini, maxi = action["min"], action["max"]
-                    # print("MIN-MAX", mini, maxi, (param_value - mini) / (maxi - mini))
-                    return param_value * (maxi - mini) + mini
-                elif action["scaling_method"] == "Standard Scaling":
-                    mean, std = action["mean"], action["std"]
-                    # print("STD", mean, std, (param_value - mean) / std)
-                    return param_value * std + mean
-                else:
-                    raise ValueError(f"Unknown scaling_method: {action['scaling_method']}")
-
-            # Elif it was label encoding
-            elif action["preproc_type"] == PreprocessingTypes.LABEL_ENCODING:
-                # Then just look for the needed key
-                mapping = action["mapping"]
-                # st.write(mapping)
-                for key, value in mapping.items():
-                    if value == param_value:
-                        return int(key)
-            else:
-                pass
+def append_fake_rows(rows):
+    """
+    Appends the fake rows (page 4) to the session dataset, and records this as a step of the preprocessing
+    checkpoints, so that undo on the page 3 removes exactly these rows.
+
+    :param rows: DataFrame with the dtypes of the dataset (see conform_to_schema() on the page 4).
+    """
+    if rows.empty:
+        return
+
+    # The cached statistics of the dataset are updated with the new rows only (see Dataset/RunningAggregates.py)
+    get_dataset_statistics(st.session_state.dataset).append_rows(rows)
+    st.session_state.fake_df = pd.concat([st.session_state.fake_df, rows], ignore_index=True)
+    st.session_state.preprocessing_checkpoints.record(st.session_state.dataset,
+                                                      st.session_state.preprocessing_history, None,
+                                                      st.session_state.fake_df)
+
 
-    return param_value  # do nothing
+def do_preprocessing(param_name: str, param_value):
+    """Applies the preprocessing actions of the session to one natural value of the column."""
+    return st.session_state.preprocessing_history.transform_value(param_name, param_value)
+
+
+def reverse_preprocessing(param_name: str, param_value):
+    """Reverses the preprocessing actions of the session for one value of the column (e.g. the predicted price)."""
+    return st.session_state.preprocessing_history.inverse_transform_value(param_name, param_value)
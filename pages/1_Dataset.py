@@ -1,13 +1,29 @@
 # imports
+import pandas as pd
 import streamlit as st
-from helpers import initialize_global_session_variables_if_not_yet, download_dataset
+
+from DashboardManager.DashboardManager import DashboardManager
+from DashboardManager.DashboardManagerEnums import DashboardItemTypes
+from helpers import initialize_global_session_variables_if_not_yet, get_dataset_store, get_dataset_source
+from Dataset.DatasetSchema import column_memory_usage
+from Dataset.PreprocessingCheckpoints import PreprocessingCheckpoints
+from Dataset.PreprocessingPipeline import PreprocessingPipeline
 
 
 # Return the dataset back to the initial state
-# def reset_dataset():
-#     # Get the dataset from cache
-#     st.session_state.df = download_dataset()
-#     st.session_state.df2 = download_dataset()
+def reset_dataset():
+    # The session keeps only its edits on top of the shared dataset, so dropping them is enough
+    st.session_state.dataset.reset()
+    st.session_state.fake_df = pd.DataFrame()
+    st.session_state.preprocessing_history = PreprocessingPipeline()
+    st.session_state.preprocessing_checkpoints = PreprocessingCheckpoints(st.session_state.dataset,
+                                                                          st.session_state.preprocessing_history)
+
+    # The preprocessing actions are not applied anymore, so remove them from the history on page 3 as well
+    preproc_manager = DashboardManager("3.5")
+    for item_id, item in list(preproc_manager.items.items()):
+        if item.get_type() == DashboardItemTypes.PREPROCESSING_BOX:
+            preproc_manager.remove_item(item_id)
 
 
 # -------- Start of the page execution --------
@@ -30,8 +46,26 @@ st.write(
 # Display the dataset
 st.write(st.session_state.df)
 
-# Reset dataset button (to be implemented in the future versions)
-# st.button("🔄 Reset Dataset", on_click=reset_dataset)
+# The external dataset is queried from the disk, and only its sample is kept in memory
+dataset_store = get_dataset_store()
+if dataset_store is not None:
+    total_rows = dataset_store.count_rows()
+    st.info(f"The dataset ``{get_dataset_source()}`` has ``{total_rows:,}`` rows. The application works with the random "
+            f"sample of ``{len(st.session_state.df):,}`` of them.")
+    with st.expander("Brands in the whole dataset"):
+        st.write(dataset_store.value_counts("brand"))
+
+# Reset the preprocessed version of the dataset (used on the page 3 and further)
+st.button("🔄 Reset Dataset", on_click=reset_dataset,
+          help="Discards all the preprocessing actions and the fake data.")
+if st.session_state.dataset.is_modified():
+    st.write(f"Your edits of the dataset take ``{st.session_state.dataset.overlay_nbytes() / 2 ** 20:.2f}`` MB "
+             f"of memory.")
+chart_cache_stats = st.session_state.chart_hashes.stats()
+if chart_cache_stats["images"]:
+    st.write(f"Your charts take ``{chart_cache_stats['bytes'] / 2 ** 20:.2f}`` MB of memory "
+             f"(``{chart_cache_stats['images']}`` images). ``{chart_cache_stats['hit_rate']:.0%}`` of the charts "
+             f"were shown from the cache.")
 
 st.markdown("""
 ---
@@ -62,6 +96,20 @@ Categorical Columns:
 Note: Some other columns from the initial dataset were excluded, as they were not related to autos.
 """)
 
+st.write("### Derived features:")
+st.write("These features are derived from the columns above once, when the dataset is loaded: the region of the "
+         "postal code (its 1st digit, ``10`` for non-German codes), the age of the vehicle in 2016, and the bands "
+         "of its power and mileage.")
+derived_features = st.session_state.derived_features
+col1, col2 = st.columns([1, 1])
+col1.write(derived_features["power_band"].value_counts(sort=False).rename("Rows"))
+col2.write(derived_features["mileage_band"].value_counts(sort=False).rename("Rows"))
+col1.write(derived_features["postal_region"].value_counts().sort_index().rename("Rows"))
+col2.write(derived_features["vehicle_age"].describe().rename("Vehicle age"))
+
 st.write("### Data types in the Dataset:")
-st.write("Note: ``object`` is actually a string.")
-st.write(st.session_state.df2.dtypes)
+st.write("Note: ``category`` is a string column, stored as a small integer code plus one shared dictionary of values. "
+         "Numerical columns are stored in the smallest type that fits their values.")
+memory_usage = column_memory_usage(st.session_state.dataset.frame)
+st.write(memory_usage)
+st.write(f"In total the dataset takes ``{memory_usage['bytes'].sum() / 2 ** 20:.2f}`` MB of memory.")
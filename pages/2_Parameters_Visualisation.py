@@ -1,12 +1,12 @@
 import os
 import streamlit as st
 
-from DashboardManager.ChartItem import ChartItem
+from DashboardManager.ChartItem import ChartItem, render_pending_charts
 from DashboardManager.DashboardItem import DashboardItem
 from DashboardManager.DashboardManagerEnums import ChartTypes, DashboardItemTypes
 from DashboardManager.MDBoxItem import MDBoxItem
 from DashboardManager.DashboardManager import DashboardManager
-from helpers import initialize_global_session_variables_if_not_yet
+from helpers import initialize_global_session_variables_if_not_yet, show_sampled_dataset_notice
 
 
 # Functions to handle changes for each input element
@@ -32,6 +32,7 @@ PAGE_NUMBER = os.path.basename(__file__).split("_")[0]  # The number in front of
 initialize_global_session_variables_if_not_yet()
 
 st.write("# Parameters Visualisation")
+show_sampled_dataset_notice()
 st.write("Here you can study the dataset in (almost) every possible way.")
 with st.expander("Brief Instruction:", expanded=False):
     st.markdown(
@@ -195,3 +196,6 @@ for item_id, item in manager.items.items():
 
 # De-comment for debugging
 # st.write(str(manager))
+
+# The charts, that are not in the cache, are rendered in parallel - show them as soon as they are ready
+render_pending_charts()
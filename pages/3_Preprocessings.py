@@ -1,12 +1,13 @@
 import os
 import streamlit as st
 
-from DashboardManager.ChartItem import ChartItem
+from DashboardManager.ChartItem import ChartItem, render_pending_charts
 from DashboardManager.DashboardItem import DashboardItem
 from DashboardManager.DashboardManagerEnums import ChartTypes, DashboardItemTypes, PreprocessingTypes
 from DashboardManager.MDBoxItem import MDBoxItem
 from DashboardManager.DashboardManager import DashboardManager
-from helpers import initialize_global_session_variables_if_not_yet, NUMERICAL_COLUMNS, execute_preprocessing_action
+from helpers import initialize_global_session_variables_if_not_yet, NUMERICAL_COLUMNS, execute_preprocessing_action, \
+    checkout_preprocessing_step, show_sampled_dataset_notice
 
 PAGE_NUMBER = os.path.basename(__file__).split("_")[0]  # The number in front of the filename
 PREPROCESSING_OPTIONS = [PreprocessingTypes.OUTLIER_REMOVAL, PreprocessingTypes.LABEL_ENCODING,
@@ -41,7 +42,42 @@ def create_some_item(item_type: DashboardItemTypes, manager: DashboardManager, i
 
 def reload_charts():
     # Assuming charts are only in the 2nd manager:
-    manager.reload_items(update_item_state, st.session_state.df2)
+    updated_ids = manager.reload_items(update_item_state, st.session_state.dataset)
+    amount_of_charts = sum(item.get_type() == DashboardItemTypes.CHART for item in manager.items.values())
+    st.toast(f"{len(updated_ids)} of {amount_of_charts} charts were updated.")
+
+
+def undo_preprocessing_action():
+    checkout_preprocessing_step(st.session_state.preprocessing_checkpoints.position - 1, preproc_manager)
+
+
+def redo_preprocessing_action():
+    checkout_preprocessing_step(st.session_state.preprocessing_checkpoints.position + 1, preproc_manager)
+
+
+def go_to_preprocessing_step():
+    checkout_preprocessing_step(st.session_state["p3_checkout_step"], preproc_manager)
+
+
+def render_sidebar_preprocessing_history_bar():
+    checkpoints = st.session_state.preprocessing_checkpoints
+
+    st.sidebar.write("- - -")
+    st.sidebar.write("#### Preprocessing steps")
+
+    col1, col2 = st.sidebar.columns([1, 1])
+    col1.button("↩️ Undo", on_click=undo_preprocessing_action, disabled=not checkpoints.can_undo(),
+                help="Discards the last preprocessing action (or the last appended fake rows).")
+    col2.button("↪️ Redo", on_click=redo_preprocessing_action, disabled=not checkpoints.can_redo(),
+                help="Executes the discarded preprocessing action again.")
+
+    step_names = checkpoints.step_names()
+    st.sidebar.selectbox("Go back to the state after the step:", range(len(step_names)),
+                         format_func=lambda step: f"{step}. {step_names[step]}",
+                         index=checkpoints.position, key="p3_checkout_step")
+    st.sidebar.button("⏪ Go to this step", on_click=go_to_preprocessing_step,
+                      help="The later steps can be redone, until you execute a new preprocessing action - "
+                           "then they are discarded, and the history continues from the chosen step.")
 
 
 def render_sidebar_preprocessing_config_bar():
@@ -95,7 +131,7 @@ def render_sidebar_preprocessing_config_bar():
         if st.sidebar.button("Apply", key="apply_preproc_action"):
             execute_preprocessing_action(
                 action_type=PreprocessingTypes.OUTLIER_REMOVAL,
-                df=df,
+                dataset=df,
                 manager=preproc_manager,
                 column=selected_column,
                 method=selected_method,
@@ -103,32 +139,36 @@ def render_sidebar_preprocessing_config_bar():
             )
 
     elif selected_type == PreprocessingTypes.LABEL_ENCODING:
-        st.sidebar.selectbox("Select column to encode", st.session_state.categorical_columns,
-                             key="p3_preprocessing_column")
-        selected_column = st.session_state["p3_preprocessing_column"]
+        # Several columns can be encoded at once - as one preprocessing action
+        st.sidebar.multiselect("Select columns to encode", st.session_state.categorical_columns,
+                               key="p3_encoding_columns")
+        selected_columns = st.session_state["p3_encoding_columns"]
 
-        if st.sidebar.button("Apply", key="apply_preproc_action"):
+        if st.sidebar.button("Apply", key="apply_preproc_action", disabled=not selected_columns):
             execute_preprocessing_action(
                 action_type=PreprocessingTypes.LABEL_ENCODING,
                 manager=preproc_manager,
-                df=df,
-                column=selected_column
+                dataset=df,
+                column=selected_columns[0] if len(selected_columns) == 1 else None,
+                columns=selected_columns if len(selected_columns) > 1 else None
             )
 
     elif selected_type == PreprocessingTypes.SCALING:
-        st.sidebar.selectbox("Select column", NUMERICAL_COLUMNS, key="p3_preprocessing_column")
-        selected_column = st.session_state["p3_preprocessing_column"]
+        # Several columns can be scaled at once - as one preprocessing action
+        st.sidebar.multiselect("Select columns", NUMERICAL_COLUMNS, key="p3_scaling_columns")
+        selected_columns = st.session_state["p3_scaling_columns"]
 
         st.sidebar.selectbox("Select scaling method", ["Min-Max Scaling", "Standard Scaling"],
                              key="p3_scaling_method")
         selected_scaling_method = st.session_state["p3_scaling_method"]
 
-        if st.sidebar.button("Apply", key="apply_preproc_action"):
+        if st.sidebar.button("Apply", key="apply_preproc_action", disabled=not selected_columns):
             execute_preprocessing_action(
                 action_type=PreprocessingTypes.SCALING,
                 manager=preproc_manager,
-                df=df,
-                column=selected_column,
+                dataset=df,
+                column=selected_columns[0] if len(selected_columns) == 1 else None,
+                columns=selected_columns if len(selected_columns) > 1 else None,
                 scaling_method=selected_scaling_method
             )
 
@@ -145,7 +185,7 @@ if "p3_preproc_type" not in st.session_state:
     st.session_state.p3_preproc_type = PREPROCESSING_OPTIONS[0]
 
 # Get some variables from session_state
-df = st.session_state.df2  # The 2nd version that can (and should) be updated
+df = st.session_state.dataset  # The 2nd version (SessionDataset) that can (and should) be updated
 
 # Manager for showing preprocessing history & MD-Boxes
 preproc_manager = DashboardManager(PAGE_NUMBER + ".5")
@@ -165,9 +205,11 @@ if not st.session_state.hardcore_mode and not st.session_state.page_3_was_ever_r
                            skip_rerun=True)
 
 render_sidebar_preprocessing_config_bar()
+render_sidebar_preprocessing_history_bar()
 
 # If we do not have any items to show, let the user create the first one
 st.write("# Preprocessing Tool")
+show_sampled_dataset_notice()
 
 with st.expander("Brief Instructions", expanded=False):
     st.markdown("""
@@ -184,8 +226,8 @@ Note: The same dataset is used on this and Faker page. So, for example, if you c
 and press `🔄 Update Charts` button, it will have impact on the graphs on this page also. 
 So I recommend applying Scaling only after you create additional Fake Data and study it sufficiently.
 
-Note: In current version there is no way to discard particular preprocessing action or mix their order 
-after they were executed. So please make sure to do it in the correct order.
+Note: Preprocessing actions cannot be reordered after they were executed. However, you can undo the last ones, 
+redo them again, or go back to the state after any step in the sidebar - and continue from there.
 """)
 
 with st.expander("Brief theory", expanded=False):
@@ -389,3 +431,6 @@ for item_id, item in manager.items.items():
                 args=(DashboardItemTypes.MD_BOX, manager, item_id),
                 kwargs={"on_change_function": update_item_state}
             )
+
+# The charts, that are not in the cache, are rendered in parallel - show them as soon as they are ready
+render_pending_charts()
@@ -1,5 +1,7 @@
 import streamlit as st
-from helpers import initialize_global_session_variables_if_not_yet, CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS
+from helpers import initialize_global_session_variables_if_not_yet, CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS, \
+    get_dataset_statistics, append_fake_rows
+from Dataset.DatasetSchema import conform_to_schema
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -18,13 +20,13 @@ initialize_global_session_variables_if_not_yet()
 # Functions for data generation
 def generate_random_data(num_rows, odometer_range, price_range):
     data = []
-    vehicle_type_options = set(st.session_state.df2["vehicle_type"])
-    transmission_options = set(st.session_state.df2["transmission"])
-    model_options = set(st.session_state.df2["model"])
-    fuel_type_options = set(st.session_state.df2["fuel_type"])
-    brand_options = set(st.session_state.df2["brand"])
-    unrepaired_damage_options = set(st.session_state.df2["unrepaired_damage"])
-    postal_code_options = set(st.session_state.df2["postal_code"])
+    vehicle_type_options = set(st.session_state.dataset.frame["vehicle_type"])
+    transmission_options = set(st.session_state.dataset.frame["transmission"])
+    model_options = set(st.session_state.dataset.frame["model"])
+    fuel_type_options = set(st.session_state.dataset.frame["fuel_type"])
+    brand_options = set(st.session_state.dataset.frame["brand"])
+    unrepaired_damage_options = set(st.session_state.dataset.frame["unrepaired_damage"])
+    postal_code_options = set(st.session_state.dataset.frame["postal_code"])
     for _ in range(num_rows):
         row = {
             "price_EUR": random.randint(*price_range),
@@ -43,18 +45,20 @@ def generate_random_data(num_rows, odometer_range, price_range):
     return pd.DataFrame(data)
 
 
-def generate_proportional_data(num_rows, df):
-    # Gather statistics from the existing dataset
-    vehicle_type_probs = df['vehicle_type'].value_counts(normalize=True).to_dict()
-    transmission_probs = df['transmission'].value_counts(normalize=True).to_dict()
-    fuel_type_probs = df['fuel_type'].value_counts(normalize=True).to_dict()
-    brand_probs = df['brand'].value_counts(normalize=True).to_dict()
-    damage_probs = df['unrepaired_damage'].value_counts(normalize=True).to_dict()
+def generate_proportional_data(num_rows, statistics):
+    # Gather statistics from the existing dataset. They are cached, and updated with every generated batch without
+    # going through the whole dataset again (see helpers.get_dataset_statistics())
+    vehicle_type_probs = statistics.value_counts('vehicle_type', normalize=True).to_dict()
+    transmission_probs = statistics.value_counts('transmission', normalize=True).to_dict()
+    fuel_type_probs = statistics.value_counts('fuel_type', normalize=True).to_dict()
+    brand_probs = statistics.value_counts('brand', normalize=True).to_dict()
+    damage_probs = statistics.value_counts('unrepaired_damage', normalize=True).to_dict()
+    models = list(statistics.value_counts('model').index)
 
-    price_mean, price_std = df['price_EUR'].mean(), df['price_EUR'].std()
-    odometer_mean, odometer_std = df['odometer_km'].mean(), df['odometer_km'].std()
-    registration_year_min, registration_year_max = df['registration_year'].min(), df['registration_year'].max()
-    power_ps_min, power_ps_max = df['power_ps'].min(), df['power_ps'].max()
+    price_mean, price_std = statistics.mean_std('price_EUR')
+    odometer_mean, odometer_std = statistics.mean_std('odometer_km')
+    registration_year_min, registration_year_max = statistics.min_max('registration_year')
+    power_ps_min, power_ps_max = statistics.min_max('power_ps')
 
     data = []
     for _ in range(num_rows):
@@ -66,7 +70,7 @@ def generate_proportional_data(num_rows, df):
             "transmission": random.choices(list(transmission_probs.keys()), weights=transmission_probs.values(), k=1)[
                 0],
             "power_ps": random.randint(power_ps_min, power_ps_max),
-            "model": fake.random_element(df['model'].unique()),
+            "model": fake.random_element(models),
             "odometer_km": max(0, int(random.gauss(odometer_mean, odometer_std))),
             "fuel_type": random.choices(list(fuel_type_probs.keys()), weights=fuel_type_probs.values(), k=1)[0],
             "brand": random.choices(list(brand_probs.keys()), weights=brand_probs.values(), k=1)[0],
@@ -160,7 +164,7 @@ st.sidebar.slider("How much procent of Fake data should be added",
                   key="p4_number_of_new_rows",
                   )
 
-num_rows = len(st.session_state.df2) * st.session_state["p4_number_of_new_rows"][0] // 100
+num_rows = len(st.session_state.dataset) * st.session_state["p4_number_of_new_rows"][0] // 100
 
 if method == "Random":
     # We need those sliders only for this method
@@ -186,8 +190,8 @@ if st.sidebar.button("Generate Data"):
     if method == "Random":
         generated_data = generate_random_data(num_rows, odometer_range, price_range)
     elif method == "Proportional":
-        if not st.session_state.df2.empty:
-            generated_data = generate_proportional_data(num_rows, st.session_state.df2)
+        if len(st.session_state.dataset) != 0:
+            generated_data = generate_proportional_data(num_rows, get_dataset_statistics(st.session_state.dataset))
         else:
             st.error("Proportional generation requires existing data.")
             generated_data = pd.DataFrame()
@@ -197,15 +201,17 @@ if st.sidebar.button("Generate Data"):
     else:
         raise ValueError("Unknown method of generating Fake Data.")
 
-    st.session_state.df2 = pd.concat([st.session_state.df2, generated_data], ignore_index=True)
-    st.session_state.fake_df = pd.concat([st.session_state.fake_df, generated_data], ignore_index=True)
-    # len(st.session_state.fake_df):len(st.session_state.fake_df) + len(generated_data) - 1] = generated_data.iloc[:]
+    # Keep the compact dtypes of the dataset (categories & downcast numbers) after the concatenation
+    generated_data = conform_to_schema(generated_data, st.session_state.dataset.frame)
+
+    # Recorded as a step of the preprocessing history, so it can be undone on the page 3
+    append_fake_rows(generated_data)
 
     st.success("Synthetic data successfully added!")
 
 # Display data
 st.subheader("Current State of Dataset")
-st.dataframe(st.session_state.df2)
+st.dataframe(st.session_state.dataset.frame)
 
 st.subheader("Fake data")
 st.dataframe(st.session_state.fake_df)
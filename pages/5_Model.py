@@ -8,7 +8,7 @@ from DashboardManager.DashboardManager import DashboardManager
 from DashboardManager.DashboardManagerEnums import DashboardItemTypes, ChartTypes
 from DashboardManager.MDBoxItem import MDBoxItem
 from DashboardManager.Model.Model import MLModel
-from helpers import initialize_global_session_variables_if_not_yet
+from helpers import initialize_global_session_variables_if_not_yet, show_sampled_dataset_notice
 
 st.set_page_config(page_title="CarLab Model", page_icon="🤖")
 
@@ -32,14 +32,16 @@ def create_some_item(item_type: DashboardItemTypes, manager: DashboardManager, i
 
 
 manager = DashboardManager(PAGE_NUMBER)
-df = st.session_state.df2
+df = st.session_state.dataset.frame
+
+# Pass the latest version of the dataset to the model (the model itself is created only once)
+ml_model = MLModel(df)
 
 st.write("# Model")
 st.write("Here you can choose, set up, and train your model.")
+show_sampled_dataset_notice()
 
 if manager.is_empty():
-    ml_model = MLModel(df)
-
     manager.create_item(DashboardItemTypes.MD_BOX,
                         item_pos=0,
                         on_change_function=update_non_model_item_state,
@@ -7,14 +7,16 @@ from pandas import DataFrame
 from DashboardManager.DashboardManagerEnums import PreprocessingTypes
 from DashboardManager.Model.Model import MLModel
 from helpers import initialize_global_session_variables_if_not_yet, CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS, \
-    reverse_preprocessing, do_preprocessing
+    reverse_preprocessing, do_preprocessing, get_dataset_statistics
 
 st.set_page_config(page_title="CarLab How Much Would Your Car Cost", page_icon="🧪")
 initialize_global_session_variables_if_not_yet()
 PAGE_NUMBER = os.path.basename(__file__).split("_")[0]  # The number in front of the filename
 
-df: DataFrame = st.session_state.df2
+df: DataFrame = st.session_state.dataset.frame
 init_df = st.session_state.df
+# The ranges and options of the inputs are taken from the statistics of the initial dataset, shared by all sessions
+init_statistics = get_dataset_statistics(init_df)
 ml_model = MLModel(df)
 
 st.write("## Prediction Tool")
@@ -42,7 +44,7 @@ else:
         col1, col2 = st.columns([1, 1])
         # Get the input value from the user
         col1.selectbox("Please select the type of desired car",
-                       sorted(list(set(init_df["vehicle_type"]))),
+                       init_statistics.unique_values("vehicle_type"),
                        index=0,
                        key="p6_vehicle_type")
 
@@ -61,8 +63,8 @@ else:
 
         # Get the input value from the user
         col1.number_input("Please select the desired registration year",
-                          min_value=min(init_df["registration_year"]),
-                          max_value=max(init_df["registration_year"]),
+                          min_value=init_statistics.min_max("registration_year")[0],
+                          max_value=init_statistics.min_max("registration_year")[1],
                           step=1,
                           value=2010,  # default value
                           key="p6_registration_year")
@@ -81,7 +83,7 @@ else:
         col1, col2 = st.columns([1, 1])
         col1.selectbox(
             "Please select the transmission type",
-            sorted(list(set(init_df["transmission"]))),
+            init_statistics.unique_values("transmission"),
             index=0,
             key="p6_transmission",
         )
@@ -97,8 +99,8 @@ else:
         col1, col2 = st.columns([1, 1])
         col1.number_input(
             "Please input the engine power (PS)",
-            min_value=min(init_df["power_ps"]),
-            max_value=max(init_df["power_ps"]),
+            min_value=init_statistics.min_max("power_ps")[0],
+            max_value=init_statistics.min_max("power_ps")[1],
             step=1,
             value=100,
             key="p6_power_ps",
@@ -116,7 +118,7 @@ else:
         col1, col2 = st.columns([1, 1])
         col1.selectbox(
             "Please select the vehicle model",
-            sorted(list(set(init_df["model"]))),
+            init_statistics.unique_values("model"),
             index=0,
             key="p6_model",
         )
@@ -132,8 +134,8 @@ else:
         col1, col2 = st.columns([1, 1])
         col1.number_input(
             "Please input the mileage (km)",
-            min_value=min(init_df["odometer_km"]),
-            max_value=max(init_df["odometer_km"]),
+            min_value=init_statistics.min_max("odometer_km")[0],
+            max_value=init_statistics.min_max("odometer_km")[1],
             step=1000,
             value=50000,
             key="p6_odometer_km",
@@ -150,7 +152,7 @@ else:
         col1, col2 = st.columns([1, 1])
         col1.selectbox(
             "Please select the fuel type",
-            sorted(list(set(init_df["fuel_type"]))),
+            init_statistics.unique_values("fuel_type"),
             index=0,
             key="p6_fuel_type",
         )
@@ -166,7 +168,7 @@ else:
         col1, col2 = st.columns([1, 1])
         col1.selectbox(
             "Please select the vehicle brand",
-            sorted(list(set(init_df["brand"]))),
+            init_statistics.unique_values("brand"),
             index=0,
             key="p6_brand",
         )
@@ -182,7 +184,7 @@ else:
         col1, col2 = st.columns([1, 1])
         col1.selectbox(
             "Please indicate if the vehicle has unrepaired damage",
-            sorted(list(set(init_df["unrepaired_damage"]))),
+            init_statistics.unique_values("unrepaired_damage"),
             index=2,
             key="p6_unrepaired_damage",
         )
@@ -198,8 +200,8 @@ else:
         col1, col2 = st.columns([1, 1])
         col1.number_input(
             "Please input the postal code",
-            min_value=min(init_df["postal_code"]),
-            max_value=max(init_df["postal_code"]),
+            min_value=init_statistics.min_max("postal_code")[0],
+            max_value=init_statistics.min_max("postal_code")[1],
             step=1,
             value=10000,
             key="p6_postal_code",
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Dataset.DatasetStatistics import CI_NORMAL, CI_STUDENT_T, mean_confidence_intervals
+
+stats = pytest.importorskip("scipy.stats")
+
+
+def test_student_t_intervals_match_scipy():
+    counts = np.array([2, 3, 4, 5, 6, 8, 10, 20, 100, 10_000])
+    moments = pd.DataFrame({"count": counts, "mean": 0.0, "var": 4.0})
+
+    quantiles = mean_confidence_intervals(moments, CI_STUDENT_T) / np.sqrt(4.0 / counts)
+    np.testing.assert_allclose(quantiles, stats.t.ppf(0.975, counts - 1), rtol=0, atol=3e-4)
+
+
+def test_normal_intervals_match_scipy():
+    moments = pd.DataFrame({"count": [1, 10, 1000], "mean": 0.0, "var": [np.nan, 9.0, 9.0]})
+
+    intervals = mean_confidence_intervals(moments, CI_NORMAL)
+    expected = stats.norm.ppf(0.975) * np.sqrt(moments["var"] / moments["count"])
+    np.testing.assert_allclose(intervals, expected)
+    assert np.isnan(mean_confidence_intervals(moments, CI_STUDENT_T)[0])  # One value has no interval
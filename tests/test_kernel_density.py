@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from Dataset.KernelDensity import binned_kde, kde, scott_bandwidth
+
+
+def _direct_kde(values, bandwidth, grid):
+    distances = (grid[:, None] - values[None, :]) / bandwidth
+    return np.exp(-0.5 * distances ** 2).sum(axis=1) / (len(values) * bandwidth * np.sqrt(2 * np.pi))
+
+
+def test_binned_kde_matches_direct_gaussian_kde():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(0, 1, 2000), rng.normal(6, 0.5, 500)])
+    bandwidth = scott_bandwidth(len(values), values.std(ddof=1))
+
+    grid, density = binned_kde(values, bandwidth, values.min(), values.max())
+    direct = _direct_kde(values, bandwidth, grid)
+    np.testing.assert_allclose(density, direct, rtol=0, atol=1e-3 * direct.max())
+
+
+def test_kde_skips_missing_values():
+    values = pd.Series([1.0, np.nan, 2.0, 4.0, np.nan])
+    grid, density = kde(values)
+
+    known = values.dropna().to_numpy()
+    direct = _direct_kde(known, scott_bandwidth(len(known), known.std(ddof=1)), grid)
+    np.testing.assert_allclose(density, direct, rtol=0, atol=1e-3 * direct.max())
+    assert len(kde(pd.Series([np.nan]))[0]) == 0
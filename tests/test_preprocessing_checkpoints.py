@@ -0,0 +1,66 @@
+import pandas as pd
+
+from DashboardManager.DashboardManagerEnums import DashboardItemTypes, PreprocessingTypes
+from Dataset.PreprocessingCheckpoints import PreprocessingCheckpoints
+from Dataset.PreprocessingPipeline import PreprocessingPipeline
+from Dataset.SessionDataset import SessionDataset
+
+
+class _Item:
+    def __init__(self, action, preprocessing_type):
+        self.action = action
+        self.preprocessing_type = preprocessing_type
+
+    def get_type(self):
+        return DashboardItemTypes.PREPROCESSING_BOX
+
+
+class _Manager:
+    def __init__(self):
+        self.items = {}
+
+    def remove_item(self, item_id):
+        del self.items[item_id]
+
+
+def _filter_step(dataset, history, checkpoints, manager):
+    dataset.filter_rows(dataset.column("price_EUR") < 300)
+    item = _Item({"column": "price_EUR", "method": "top", "threshold": 25}, PreprocessingTypes.OUTLIER_REMOVAL)
+    manager.items[len(manager.items)] = item
+    history.append({"preproc_type": PreprocessingTypes.OUTLIER_REMOVAL, **item.action})
+    checkpoints.record(dataset, history, item)
+
+
+def test_undo_after_append_removes_only_the_appended_rows():
+    dataset = SessionDataset(pd.DataFrame({"price_EUR": [100, 200, 300, 400]}))
+    history, manager = PreprocessingPipeline(), _Manager()
+    checkpoints = PreprocessingCheckpoints(dataset, history)
+    _filter_step(dataset, history, checkpoints, manager)
+
+    fake_rows = pd.DataFrame({"price_EUR": [150, 250]})
+    dataset.append_rows(fake_rows)
+    checkpoints.record(dataset, history, None, fake_rows)
+    assert checkpoints.step_names()[-1] == "Appending of 2 fake rows"
+
+    history = checkpoints.undo(dataset, manager)
+    assert dataset.column("price_EUR").tolist() == [100, 200]
+    assert len(checkpoints.fake_rows) == 0
+    assert len(history) == 1 and len(manager.items) == 1  # The preprocessing step is still there
+
+    checkpoints.redo(dataset, manager)
+    assert dataset.column("price_EUR").tolist() == [100, 200, 150, 250]
+    assert checkpoints.fake_rows is fake_rows
+
+
+def test_undo_before_append_removes_the_appended_rows_too():
+    dataset = SessionDataset(pd.DataFrame({"price_EUR": [100, 200, 300, 400]}))
+    history, manager = PreprocessingPipeline(), _Manager()
+    checkpoints = PreprocessingCheckpoints(dataset, history)
+    _filter_step(dataset, history, checkpoints, manager)
+    dataset.append_rows(pd.DataFrame({"price_EUR": [150]}))
+    checkpoints.record(dataset, history, None, pd.DataFrame({"price_EUR": [150]}))
+
+    history = checkpoints.checkout(0, dataset, manager)
+    assert dataset.column("price_EUR").tolist() == [100, 200, 300, 400]
+    assert len(checkpoints.fake_rows) == 0
+    assert len(history) == 0 and not manager.items
@@ -0,0 +1,30 @@
+import numpy as np
+
+from DashboardManager.DashboardManagerEnums import PreprocessingTypes
+from Dataset.PreprocessingPipeline import PreprocessingPipeline
+
+
+def _pipeline():
+    # The mapping, as it is loaded from the JSON history (the codes are strings)
+    return PreprocessingPipeline([{
+        "preproc_type": PreprocessingTypes.LABEL_ENCODING,
+        "column": "brand",
+        "mapping": {"0": "audi", "1": "bmw", "3": "opel"},
+    }])
+
+
+def test_label_encoding_round_trip():
+    pipeline = _pipeline()
+    codes = pipeline.transform_values("brand", ["opel", "audi", "bmw"])
+
+    assert codes.tolist() == [3, 0, 1]
+    assert pipeline.inverse_transform_values("brand", codes).tolist() == ["opel", "audi", "bmw"]
+
+
+def test_unknown_label_codes_decode_to_nan():
+    pipeline = _pipeline()
+    assert pipeline.transform_values("brand", ["tesla"]).tolist() == [-1]
+
+    decoded = pipeline.inverse_transform_values("brand", [-1, 2, 0.5, 4, 1])
+    assert decoded[-1] == "bmw"
+    assert all(isinstance(value, float) and np.isnan(value) for value in decoded[:-1])
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Dataset import QueryBackend
+
+duckdb = pytest.importorskip("duckdb")
+
+
+def _frame():
+    rng = np.random.default_rng(0)
+    values = rng.normal(1000, 300, 500).round()
+    values[::17] = np.nan
+    return pd.DataFrame({
+        "brand": rng.choice(["audi", "bmw", "opel", None], 500),
+        "price_EUR": values,
+    })
+
+
+def _without_duckdb(monkeypatch, func, *args):
+    with monkeypatch.context() as patch:
+        patch.setattr(QueryBackend, "duckdb", None)
+        return func(*args)
+
+
+@pytest.mark.parametrize("column", ["price_EUR", "empty"])
+def test_quantiles_match_pandas(monkeypatch, column):
+    df = _frame().assign(empty=np.nan)
+    qs = [0.0, 0.05, 0.25, 0.5, 0.95, 1.0]
+
+    expected = _without_duckdb(monkeypatch, QueryBackend.quantiles, df, column, qs)
+    np.testing.assert_allclose(QueryBackend.quantiles(df, column, qs), expected)
+
+
+def test_five_number_summaries_match_pandas(monkeypatch):
+    outliers = pd.DataFrame({"brand": ["audi", "bmw"], "price_EUR": [5000.0, -2000.0]})
+    df = pd.concat([_frame(), outliers], ignore_index=True)  # The whiskers are not the smallest and largest values
+
+    expected = _without_duckdb(monkeypatch, QueryBackend.five_number_summaries, df, "brand", "price_EUR")
+    pd.testing.assert_frame_equal(QueryBackend.five_number_summaries(df, "brand", "price_EUR"), expected,
+                                  check_dtype=False, check_names=False)
+
+
+def test_group_moments_match_pandas(monkeypatch):
+    df = _frame()
+
+    expected = _without_duckdb(monkeypatch, QueryBackend.group_moments, df, "brand", "price_EUR")
+    pd.testing.assert_frame_equal(QueryBackend.group_moments(df, "brand", "price_EUR"), expected,
+                                  check_dtype=False, check_names=False)
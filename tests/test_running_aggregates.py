@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from Dataset.DatasetStatistics import DatasetStatistics
+from Dataset.RunningAggregates import HISTOGRAM_BINS, RunningAggregates
+from Dataset.SessionDataset import SessionDataset
+
+
+def _frame(seed, size):
+    rng = np.random.default_rng(seed)
+    price = rng.normal(1e6, 10, size)  # Large mean and small variance, that is lost by the naive sums
+    mileage = 3 * price + rng.normal(0, 20, size)
+    price[::7] = np.nan
+    return pd.DataFrame({"price_EUR": price, "mileage_km": mileage})
+
+
+def _empty_like(aggregates):
+    return RunningAggregates(aggregates.numerical_columns, aggregates.dtypes, aggregates.categorical_columns,
+                             aggregates.shift, aggregates.histogram_edges)
+
+
+def test_merged_and_updated_moments_match_numpy():
+    first, second = _frame(0, 300), _frame(1, 200)
+    everything = pd.concat([first, second], ignore_index=True)
+
+    updated = RunningAggregates.from_frame(first)
+    updated.update(second)
+    merged = RunningAggregates.from_frame(first)
+    part = _empty_like(merged)
+    part.update(second)
+    merged.merge(part)
+
+    for aggregates in (updated, merged):
+        for column in everything.columns:
+            values = everything[column].dropna().to_numpy()
+            mean, std = aggregates.mean_std(column)
+            np.testing.assert_allclose(mean, values.mean(), rtol=1e-12)
+            np.testing.assert_allclose(std ** 2, np.var(values, ddof=1), rtol=1e-9)
+
+        known = everything.dropna().to_numpy().T
+        covariance = np.cov(known)
+        expected = covariance[0, 1] / np.sqrt(covariance[0, 0] * covariance[1, 1])
+        correlation = aggregates.correlation_matrix(list(everything.columns))
+        np.testing.assert_allclose(correlation.loc["price_EUR", "mileage_km"], expected, rtol=1e-9)
+
+
+def test_histogram_keeps_fixed_bins_after_appended_values_outside_of_them():
+    dataset = SessionDataset(pd.DataFrame({"price_EUR": np.arange(100.0)}))
+    statistics = DatasetStatistics(dataset)
+    counts, edges = statistics.histogram("price_EUR")
+    assert len(counts) == HISTOGRAM_BINS and (edges[0], edges[-1]) == (0, 99)
+
+    dataset.append_rows(pd.DataFrame({"price_EUR": [500.0]}))
+    counts, edges = statistics.histogram("price_EUR")
+    assert len(counts) == HISTOGRAM_BINS and (edges[0], edges[-1]) == (0, 500) and counts.sum() == 101
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from Dataset.SessionDataset import SessionDataset
+
+
+def _base():
+    return pd.DataFrame({"price_EUR": [100.0, 200.0, 300.0, 400.0], "power_ps": [60.0, 90.0, 120.0, 150.0]})
+
+
+def test_shared_restore_gives_new_versions_to_the_other_values():
+    base = _base()
+    other = SessionDataset(base)
+    other.transform_column("price_EUR", lambda values: values * 2)
+    other.apply_pending()
+    snapshot = other.snapshot()
+
+    dataset = SessionDataset(base)
+    dataset.transform_column("power_ps", lambda values: values + 1)
+    dataset.filter_rows(dataset.column("price_EUR") > 100)
+    dataset.apply_pending()
+    price_version, rows_version = dataset.version(["price_EUR"]), dataset.version([])
+    last_version = dataset.version()
+
+    dataset.restore(snapshot, shared=True)
+    assert dataset.column("price_EUR").tolist() == [200.0, 400.0, 600.0, 800.0]
+    # The versions of the other session are not reused: the restored values are new for this one
+    assert dataset.version(["price_EUR"]) > last_version and dataset.version([]) > last_version
+    assert dataset.version(["price_EUR"]) != price_version and dataset.version([]) != rows_version
+
+
+def test_shared_restore_keeps_the_versions_of_the_same_values():
+    base = _base()
+    dataset = SessionDataset(base)
+    dataset.transform_column("price_EUR", lambda values: values * 2)
+    dataset.apply_pending()
+    snapshot = dataset.snapshot()
+    version = dataset.version()
+
+    copy = SessionDataset(base)
+    copy.restore(snapshot, shared=True)
+    assert copy.version() > 0  # Not the version of the base, as the values differ
+
+    dataset.restore(snapshot, shared=True)
+    assert dataset.version() == version
@@ -0,0 +1,28 @@
+import os
+import threading
+
+from Dataset.TwoTierCache import TwoTierCache
+
+
+def _files(directory, suffix):
+    return [name for _, _, names in os.walk(directory) for name in names if name.endswith(suffix)]
+
+
+def test_disk_size_is_tracked_and_pruned(tmp_path):
+    cache = TwoTierCache(str(tmp_path), max_memory_items=2, max_disk_bytes=3000)
+    for i in range(10):
+        cache.put(i, b"x" * 1000)
+
+    assert cache._disk_bytes == cache._scan_disk_bytes() <= 3000
+    assert cache.get(9) == b"x" * 1000  # The most recent values are kept
+    cache.put(9, b"y" * 1000)  # Replacing the value does not count its file twice
+    assert cache._disk_bytes == cache._scan_disk_bytes()
+
+
+def test_unpicklable_value_stays_in_memory_without_temporary_files(tmp_path):
+    cache = TwoTierCache(str(tmp_path))
+    lock = threading.Lock()
+    cache.put("lock", lock)
+
+    assert cache.get("lock") is lock
+    assert not _files(tmp_path, ".tmp") and not _files(tmp_path, ".pkl")